@@ -59,6 +59,9 @@ HYPERMETROPAIR_NOT_EXIST = 1077674242
 REPLICATIONPAIR_NOT_EXIST = 1077937923
 
 RELOGIN_ERROR_PASS = [ERROR_VOLUME_NOT_EXIST]
+QUERY_PAGE_SIZE = 100
+ERROR_PARAMETER_INCORRECT = 50331651
+FILTER_UNSUPPORTED_ERRORS = (ERROR_PARAMETER_INCORRECT,)
 RUNNING_NORMAL = '1'
 RUNNING_SYNC = '23'
 RUNNING_STOP = '41'
@@ -72,7 +75,6 @@ THIN_LUNTYPE = 1
 MAX_HOSTNAME_LENGTH = 31
 MAX_VOL_DESCRIPTION = 170
 PORT_NUM_PER_CONTR = 2
-MAX_QUERY_COUNT = 100
 
 OS_TYPE = {'Linux': '0',
            'Windows': '1',
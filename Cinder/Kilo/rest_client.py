@@ -61,6 +61,7 @@ class RestClient(object):
         self.metro_domain = kwargs.get('metro_domain', None)
         self.semaphore = threading.Semaphore(20)
         self.call_lock = lockutils.ReaderWriterLock()
+        self.unfiltered_urls = set()
         self.session = None
         self.url = None
         self.ssl_cert_verify = self.configuration.ssl_cert_verify
@@ -607,21 +608,62 @@ class RestClient(object):
         LOG.info('Use ALUA %s when adding initiator to host.', alua_info)
         self._use_iscsi_alua(initiator_name, alua_info)
 
+    def _get_page_query(self, obj_url, err_str):
+        def _query_page(start, end):
+            url = "%s?range=[%d-%d]" % (obj_url, start, end)
+            result = self.call(url, None, "GET")
+            self._assert_rest_result(result, err_str)
+            return result.get('data', [])
+
+        return _query_page
+
+    def _iter_objects(self, obj_url, err_str, prefetch=False):
+        """Iterate over all objects of obj_url page by page."""
+        return huawei_utils.iter_pages(self._get_page_query(obj_url, err_str),
+                                       prefetch=prefetch)
+
+    def _find_objects(self, obj_url, key, value, err_str):
+        """Find the objects of obj_url whose key equals value.
+
+        The objects are queried by filter, or scanned page by page on the
+        firmware rejecting the filter as unsupported. As key is unique, the
+        scan stops at the first match.
+        """
+        if obj_url not in self.unfiltered_urls:
+            url = "%s?filter=%s::%s" % (obj_url, key, value)
+            result = self.call(url, None, "GET")
+            if result['error']['code'] == 0:
+                return [item for item in result.get('data', [])
+                        if item.get(key) == value]
+            if (result['error']['code'] not in
+                    constants.FILTER_UNSUPPORTED_ERRORS):
+                self._assert_rest_result(result, err_str)
+
+            LOG.warning(_LW('Query %(url)s by filter error: %(res)s, scan '
+                            'all objects instead.'),
+                        {'url': obj_url, 'res': result})
+            self.unfiltered_urls.add(obj_url)
+
+        item = huawei_utils.find_in_pages(
+            self._get_page_query(obj_url, err_str),
+            lambda item: item.get(key) == value)
+        return [item] if item else []
+
     def find_hostgroup(self, groupname):
         """Get the given hostgroup id."""
-        url = "/hostgroup?range=[0-8191]"
-        result = self.call(url, None, "GET")
-        self._assert_rest_result(result, _('Get hostgroup information error.'))
-
-        return self._get_id_from_result(result, groupname, 'NAME')
+        hostgroups = self._find_objects(
+            '/hostgroup', 'NAME', groupname,
+            _('Get hostgroup information error.'))
+        if hostgroups:
+            return hostgroups[0]['ID']
 
     def _find_lungroup(self, lungroup_name):
         """Get the given hostgroup id."""
-        url = "/lungroup?range=[0-8191]"
-        result = self.call(url, None, "GET")
-        self._assert_rest_result(result, _('Get lungroup information error.'))
-
-        return self._get_id_from_result(result, lungroup_name, 'NAME')
+        lungroups = self._find_objects(
+            '/lungroup', 'NAME', lungroup_name,
+            _('Get lungroup information error.'))
+        if lungroups:
+            return lungroups[0]['ID']
 
     def create_hostgroup_with_check(self, hostgroup_name):
         """Check if host exists on the array, or create it."""
@@ -852,23 +894,20 @@ class RestClient(object):
 
     def _initiator_is_added_to_array(self, ininame):
         """Check whether the initiator is already added on the array."""
-        url = "/iscsi_initiator?range=[0-1023]"
-        result = self.call(url, None, "GET")
-        self._assert_rest_result(result,
-                                 _('Check initiator added to array error.'))
-
-        if self._get_id_from_result(result, ininame, 'ID'):
+        initiators = self._find_objects(
+            '/iscsi_initiator', 'ID', ininame,
+            _('Check initiator added to array error.'))
+        if initiators:
             return True
         return False
 
     def is_initiator_associated_to_host(self, ininame, host_id):
         """Check whether the initiator is associated to the host."""
-        url = "/iscsi_initiator?range=[0-1023]"
-        result = self.call(url, None, "GET")
-        self._assert_rest_result(
-            result, _('Check initiator associated to host error.'))
+        initiators = self._find_objects(
+            '/iscsi_initiator', 'ID', ininame,
+            _('Check initiator associated to host error.'))
 
-        for item in result.get('data'):
+        for item in initiators:
             if item['ID'] == ininame:
                 if item['ISFREE'] == "true":
                     return False
@@ -1860,15 +1899,13 @@ class RestClient(object):
 
     def is_fc_initiator_associated_to_host(self, ininame):
         """Check whether the initiator is associated to the host."""
-        url = '/fc_initiator?range=[0-65535]'
-        result = self.call(url, None, "GET")
-        self._assert_rest_result(result,
-                                 'Check initiator associated to host error.')
+        initiators = self._find_objects(
+            '/fc_initiator', 'ID', ininame,
+            'Check initiator associated to host error.')
 
-        if "data" in result:
-            for item in result['data']:
-                if item['ID'] == ininame and item['ISFREE'] != "true":
-                    return True
+        for item in initiators:
+            if item['ISFREE'] != "true":
+                return True
         return False
 
     def remove_fc_from_host(self, initiator):
@@ -1929,36 +1966,11 @@ class RestClient(object):
 
         return result.get('data', [])
 
-    def get_fc_initiator_count(self):
-        url = '/fc_initiator/count'
-        result = self.call(url, None, "GET")
-
-        msg = _('Get fc initiator count error.')
-        self._assert_rest_result(result, msg)
-        self._assert_data_in_result(result, msg)
-
-        return int(result['data']['COUNT'])
-
     def get_fc_initiator_on_array(self):
-        count = self.get_fc_initiator_count()
-        if count <= 0:
-            return []
-
-        fc_initiators = []
-        for i in range((count - 1) / constants.MAX_QUERY_COUNT + 1):
-            url = '/fc_initiator?range=[%d-%d]' % (
-                i * constants.MAX_QUERY_COUNT,
-                (i + 1) * constants.MAX_QUERY_COUNT)
-            result = self.call(url, None, "GET")
-
-            msg = _('Get FC initiators from array error.')
-            self._assert_rest_result(result, msg)
-
-            if 'data' in result:
-                for item in result['data']:
-                    fc_initiators.append(item['ID'])
-
-        return fc_initiators
+        fc_initiators = self._iter_objects(
+            '/fc_initiator', _('Get FC initiators from array error.'),
+            prefetch=True)
+        return [item['ID'] for item in fc_initiators]
 
     def get_hyper_domain_id(self, domain_name):
         url = "/HyperMetroDomain?range=[0-32]"
@@ -16,6 +16,8 @@
 import hashlib
 import json
 import six
+import sys
+import threading
 import time
 
 from oslo_log import log as logging
@@ -224,3 +226,75 @@ def check_feature_available(feature_status, features):
             return True
 
     return False
+
+
+class _PageFetcher(threading.Thread):
+    """Query one page of a ranged list query in a daemon thread.
+
+    result() waits for the query, then returns its objects or re-raises
+    its exception in the caller's thread.
+    """
+
+    def __init__(self, query_page, begin, end):
+        super(_PageFetcher, self).__init__()
+        self.daemon = True
+        self._query_page = query_page
+        self._begin = begin
+        self._end = end
+        self._objs = None
+        self._exc_info = None
+
+    def run(self):
+        try:
+            self._objs = self._query_page(self._begin, self._end)
+        except Exception:
+            self._exc_info = sys.exc_info()
+
+    def result(self):
+        self.join()
+        if self._exc_info:
+            six.reraise(*self._exc_info)
+        return self._objs
+
+
+def iter_pages(query_page, page_size=constants.QUERY_PAGE_SIZE,
+               prefetch=False):
+    """Yield the objects of a ranged list query page by page.
+
+    query_page(start, end) returns the objects in range [start, end). The
+    next page is queried only when the current one is used up, and the
+    iteration ends at the first page shorter than page_size. With prefetch,
+    a _PageFetcher queries the next page while the current one is yielded,
+    which costs one unused page query if the caller stops early.
+    """
+    start = 0
+    fetcher = None
+    while True:
+        if fetcher:
+            objs = fetcher.result()
+        else:
+            objs = query_page(start, start + page_size)
+
+        fetcher = None
+        if prefetch and len(objs) >= page_size:
+            fetcher = _PageFetcher(query_page, start + page_size,
+                                   start + 2 * page_size)
+            fetcher.start()
+
+        for obj in objs:
+            yield obj
+
+        if len(objs) < page_size:
+            return
+        start += page_size
+
+
+def find_in_pages(query_page, predicate, **kwargs):
+    """Return the first object of a ranged list query matching predicate.
+
+    The pages after the matched one are not queried. Returns None if no
+    object matches. kwargs are passed to iter_pages.
+    """
+    for obj in iter_pages(query_page, **kwargs):
+        if predicate(obj):
+            return obj
@@ -20,6 +20,9 @@ The common classes provide the drivers command line operation using SSH.
 """
 
 import base64
+import contextlib
+import functools
+import inspect
 import re
 import six
 import socket
@@ -58,54 +61,113 @@ HOST_LUN_ERR_MSG = 'host LUN is mapped or does not exist'
 contrs = ['A', 'B']
 
 
+def synchronized(lock_name):
+    """Serialize calls working on the same array object.
+
+    The lock name is formatted with the call arguments, e.g.
+    'huawei-{volume[name]}', so that commands on different volumes
+    can run on the SSH pool at the same time.
+    """
+    def wrap(func):
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            call_args = inspect.getcallargs(func, *args, **kwargs)
+            name = lock_name.format(**call_args)
+            return utils.synchronized(name, external=False)(func)(
+                *args, **kwargs)
+        return wrapped
+    return wrap
+
+
+def query_scope(func):
+    """Share the output of show* commands within one client operation."""
+    @functools.wraps(func)
+    def wrapped(self, *args, **kwargs):
+        with self._query_scope_ctx():
+            return func(self, *args, **kwargs)
+    return wrapped
+
+
 def ssh_read(user, channel, cmd, timeout):
     """Get results of CLI commands."""
-    result = ''
+    prompt = user + ':/>'
+    echo = prompt + cmd
+    markers = ('Welcome', 'y/n', 'y or n', 'No response message',
+               'relogin', echo)
+    # Only the new output and the end of the former one need to be
+    # searched for the markers, so that long outputs are read in linear
+    # time. The tail must be long enough to hold any marker.
+    tail_len = max(len(marker) for marker in markers + (prompt,))
+    chunks = []
+    head = ''
+    tail = ''
+    found = set()
     output = None
     channel.settimeout(timeout)
     while True:
         try:
             output = channel.recv(8192)
-            result = result + output
         except socket.timeout as err:
             msg = _('ssh_read: Read SSH timeout. %s') % err
             LOG.error(msg)
             raise err
         else:
+            chunks.append(output)
+            if len(head) < len(cmd):
+                head += output[:len(cmd) - len(head)]
+            window = tail + output
+            found.update(marker for marker in markers if marker in window)
+            tail = window[-tail_len:]
+
             # CLI returns welcome information when first log in. So need to
             # deal differently.
-            if not re.search('Welcome', result):
+            if 'Welcome' not in found:
                 # Complete CLI response starts with CLI cmd and
                 # ends with "username:/>".
-                if result.startswith(cmd) and result.endswith(user + ':/>'):
+                if head == cmd and tail.endswith(prompt):
                     break
                 # Some commands need to send 'y'.
-                elif re.search('(y/n)|y or n', result):
+                elif 'y/n' in found or 'y or n' in found:
                     break
                 # Reach maximum limit of SSH connection.
-                elif re.search('No response message', result):
+                elif 'No response message' in found:
                     msg = _('No response message. Please check system status.')
                     LOG.error(msg)
                     raise exception.CinderException(msg)
-                elif re.search('relogin', result):
+                elif 'relogin' in found:
                     msg = _('The client is reject by the storate server ')
                     LOG.error(msg)
                     raise exception.CinderException(msg)
-            elif (re.search(user + ':/>' + cmd, result) and
-                  result.endswith(user + ':/>')):
+            elif echo in found and tail.endswith(prompt):
                 break
             if not output:
                 LOG.error(_LE('Output is empty.'))
                 break
 
+    result = ''.join(chunks)
     # Filter the last line: username:/> .
-    result = '\r\n'.join(result.split('\r\n')[:-1])
+    result = result[:max(result.rfind('\r\n'), 0)]
     # Filter welcome information.
-    index = result.find(user + ':/>')
+    index = result.find(prompt)
 
     return (result[index:] if index > -1 else result)
 
 
+def parse_cli_table(out, min_columns=0, start=6):
+    """Parse the rows of a CLI show* table.
+
+    Return a list of column lists, skipping the title and header lines
+    before start and the border line and prompt at the end. Rows with
+    fewer than min_columns columns are dropped.
+    """
+    rows = []
+    for line in out.split('\r\n')[start:-2]:
+        row = line.split()
+        if len(row) >= min_columns:
+            rows.append(row)
+    return rows
+
+
 class TseriesClient(object):
     """Common class for Huawei T series storage arrays."""
 
@@ -117,8 +179,11 @@ class TseriesClient(object):
         self.hostgroup_id = None
         self.ssh_pool = None
         self.lock_ip = threading.Lock()
+        self.lock_state = threading.Lock()
         self.luncopy_list = []  # To store LUNCopy name
+        self.query_memo = threading.local()
 
+    @query_scope
     def do_setup(self, context):
         """Check config file."""
         LOG.debug('do_setup')
@@ -280,6 +345,7 @@ class TseriesClient(object):
                 LOG.error(err_msg)
                 raise exception.InvalidInput(reason=err_msg)
 
+    @synchronized('huawei-conf-{self.configuration.cinder_huawei_conf_file}')
     def _get_login_info(self):
         """Get login IP, username and password from config file."""
         logininfo = {}
@@ -345,13 +411,12 @@ class TseriesClient(object):
 
     def _get_all_luncopy_name(self):
         cli_cmd = 'showluncopy'
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         luncopy_ids = []
         if re.search('LUN Copy Information', out):
-            for line in out.split('\r\n')[6:-2]:
-                tmp_line = line.split()
-                if tmp_line[0].startswith(VOL_AND_SNAP_NAME_PREFIX):
-                    luncopy_ids.append(tmp_line[0])
+            for luncopy in parse_cli_table(out, min_columns=1):
+                if luncopy[0].startswith(VOL_AND_SNAP_NAME_PREFIX):
+                    luncopy_ids.append(luncopy[0])
         return luncopy_ids
 
     def _get_extended_lun(self, luns):
@@ -394,7 +459,7 @@ class TseriesClient(object):
 
     def _get_lun_wwn(self, lun_id):
         cli_cmd = ('showlun -lun %s' % lun_id)
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         if re.search('LUN Information', out):
             try:
                 line = out.split('\r\n')[6]
@@ -415,7 +480,8 @@ class TseriesClient(object):
             raise exception.VolumeBackendAPIException(data=err_msg)
         return lun_wwn
 
-    @utils.synchronized('huawei', external=False)
+    @query_scope
+    @synchronized('huawei-{volume[name]}')
     def create_volume(self, volume):
         """Create a new volume."""
         volume_name = self._name_translate(volume['name'])
@@ -613,22 +679,30 @@ class TseriesClient(object):
             prefetch_value_or_times = '-times %s' % params['PrefetchTimes']
 
         cli_cmd = cli_cmd + pretype + prefetch_value_or_times
-        out = self._execute_cli(cli_cmd)
-
-        self._assert_cli_operate_out('_create_volume',
-                                     'Failed to create volume %s' % name,
-                                     cli_cmd, out)
-        if ctr:
-            self._update_lun_distribution(ctr)
+        try:
+            out = self._execute_cli(cli_cmd)
+            self._assert_cli_operate_out('_create_volume',
+                                         'Failed to create volume %s' % name,
+                                         cli_cmd, out)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                if ctr:
+                    self._update_lun_distribution(ctr, -1)
         return self._get_lun_id(name)
 
     def _calculate_lun_ctr(self):
-        return ('a' if self.lun_distribution[0] <= self.lun_distribution[1]
-                else 'b')
-
-    def _update_lun_distribution(self, ctr):
+        # Count the LUN on the chosen controller at once, so that
+        # concurrent creations do not all pick the same controller.
+        with self.lock_state:
+            index = (0 if self.lun_distribution[0] <=
+                     self.lun_distribution[1] else 1)
+            self.lun_distribution[index] += 1
+        return ('a' if index == 0 else 'b')
+
+    def _update_lun_distribution(self, ctr, count=1):
         index = (0 if ctr == 'a' else 1)
-        self.lun_distribution[index] += 1
+        with self.lock_state:
+            self.lun_distribution[index] += count
 
     def _get_lun_params(self, volume):
         params_conf = self._parse_conf_lun_params()
@@ -699,7 +773,42 @@ class TseriesClient(object):
         channel.resize_pty(width, height)
         return channel
 
-    @utils.synchronized('huawei-cli', external=False)
+    @contextlib.contextmanager
+    def _query_scope_ctx(self):
+        """Reuse the output of show* commands until the array changes.
+
+        Scopes are per thread. A nested scope joins the outer one.
+        """
+        if getattr(self.query_memo, 'outputs', None) is not None:
+            yield
+            return
+
+        self.query_memo.outputs = {}
+        try:
+            yield
+        finally:
+            self.query_memo.outputs = None
+
+    def _query_cli(self, cli_cmd, refresh=False):
+        """Run a show* command, reusing its output within a query scope.
+
+        Pollers pass refresh to always run the command, the output is
+        still kept for the lookups that follow.
+        """
+        outputs = getattr(self.query_memo, 'outputs', None)
+        if outputs is None:
+            return self._execute_cli(cli_cmd)
+        if refresh or cli_cmd not in outputs:
+            outputs[cli_cmd] = self._execute_cli(cli_cmd)
+        return outputs[cli_cmd]
+
+    def _get_ssh_pool(self, ip, user, pwd):
+        with self.lock_ip:
+            if not self.ssh_pool:
+                self.ssh_pool = ssh_utils.SSHPool(ip, 22, 30, user, pwd,
+                                                  max_size=20)
+            return self.ssh_pool
+
     def _execute_cli(self, cmd):
         """Build SSH connection and execute CLI commands.
 
@@ -710,14 +819,18 @@ class TseriesClient(object):
 
         if (' -pwd ' not in cmd) and (' -opwd ' not in cmd):
             LOG.debug('CLI command: %s' % cmd)
+        outputs = getattr(self.query_memo, 'outputs', None)
+        if outputs and not cmd.startswith('show'):
+            # The command may change the array, so the former query
+            # outputs are out of date.
+            outputs.clear()
         connect_times = 1
         ip0 = self.login_info['ControllerIP0']
         ip1 = self.login_info['ControllerIP1']
         user = self.login_info['UserName']
         pwd = self.login_info['UserPassword']
-        if not self.ssh_pool:
-            self.ssh_pool = ssh_utils.SSHPool(ip0, 22, 30, user, pwd,
-                                              max_size=20)
+        # Commands run concurrently, each one on its own pooled client.
+        ssh_pool = self._get_ssh_pool(ip0, user, pwd)
         ssh_client = None
         while True:
             try:
@@ -725,34 +838,33 @@ class TseriesClient(object):
                     # Switch to the other controller.
                     with self.lock_ip:
                         if ssh_client:
-                            if ssh_client.server_ip == self.ssh_pool.ip:
-                                self.ssh_pool.ip = (ip1
-                                                    if self.ssh_pool.ip == ip0
-                                                    else ip0)
+                            if ssh_client.server_ip == ssh_pool.ip:
+                                ssh_pool.ip = (ip1 if ssh_pool.ip == ip0
+                                               else ip0)
                             old_ip = ssh_client.server_ip
                             # Create a new client to replace the old one.
                             if getattr(ssh_client, 'chan', None):
                                 ssh_client.chan.close()
                                 ssh_client.close()
-                                ssh_client = self.ssh_pool.create()
+                                ssh_client = ssh_pool.create()
                                 self._reset_transport_timeout(ssh_client, 0.1)
                         else:
-                            self.ssh_pool.ip = ip1
+                            ssh_pool.ip = ip1
                             old_ip = ip0
 
                     LOG.info(_LI('_execute_cli: Can not connect to IP '
                                  '%(old)s, try to connect to the other '
                                  'IP %(new)s.'),
-                             {'old': old_ip, 'new': self.ssh_pool.ip})
+                             {'old': old_ip, 'new': ssh_pool.ip})
 
                 if not ssh_client:
                     # Get an SSH client from SSH pool.
-                    ssh_client = self.ssh_pool.get()
+                    ssh_client = ssh_pool.get()
                     self._reset_transport_timeout(ssh_client, 0.1)
                 # "server_ip" shows the IP of SSH server.
                 if not getattr(ssh_client, 'server_ip', None):
                     with self.lock_ip:
-                        setattr(ssh_client, 'server_ip', self.ssh_pool.ip)
+                        setattr(ssh_client, 'server_ip', ssh_pool.ip)
                 # An SSH client owns one "chan".
                 if not getattr(ssh_client, 'chan', None):
                     setattr(ssh_client, 'chan',
@@ -786,7 +898,7 @@ class TseriesClient(object):
                         raise exception.VolumeBackendAPIException(data=err_msg)
                     else:
                         # Put SSH client back into SSH pool.
-                        self.ssh_pool.put(ssh_client)
+                        ssh_pool.put(ssh_client)
                         return out
 
             except Exception as err:
@@ -794,11 +906,14 @@ class TseriesClient(object):
                     connect_times += 1
                     continue
                 else:
-                    if self.ssh_pool and ssh_client:
-                        self.ssh_pool.remove(ssh_client)
+                    if ssh_client:
+                        ssh_pool.remove(ssh_client)
                     # Set ssh_pool as None when connect error,or the next
-                    # command connect will also error.
-                    self.ssh_pool = None
+                    # command connect will also error. Leave a pool that
+                    # another command has already rebuilt alone.
+                    with self.lock_ip:
+                        if self.ssh_pool is ssh_pool:
+                            self.ssh_pool = None
                     LOG.error(_LE('_execute_cli: %s'), err)
                     raise err
 
@@ -806,7 +921,8 @@ class TseriesClient(object):
         transport = ssh.get_transport()
         transport.sock.settimeout(time)
 
-    @utils.synchronized('huawei', external=False)
+    @query_scope
+    @synchronized('huawei-{volume[name]}')
     def delete_volume(self, volume):
         lun_id = self.check_volume_exist_on_array(volume)
         if not lun_id:
@@ -836,17 +952,14 @@ class TseriesClient(object):
 
     def _get_extended_lun_member(self, lun_id):
         cli_cmd = 'showextlunmember -ext %s' % lun_id
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
 
         members = []
         if re.search('Extending LUN Member Information', out):
             try:
-                for line in out.split('\r\n')[6:-2]:
-                    tmp_line = line.split()
-                    if len(tmp_line) < 3:
-                        continue
-                    if tmp_line[2] != 'Master':
-                        members.append(tmp_line[0])
+                for member in parse_cli_table(out, min_columns=3):
+                    if member[2] != 'Master':
+                        members.append(member[0])
             except Exception:
                 err_msg = (_('CLI out is not normal. CLI out: %s') % out)
                 LOG.error(err_msg)
@@ -885,7 +998,8 @@ class TseriesClient(object):
                                       % volumeid),
                                      cli_cmd, out)
 
-    @utils.synchronized('huawei', external=False)
+    @query_scope
+    @synchronized('huawei-{snapshot[name]}')
     def create_volume_from_snapshot(self, volume, snapshot):
         """Create a volume from a snapshot.
 
@@ -940,7 +1054,8 @@ class TseriesClient(object):
         """Copy a volume or snapshot to target volume."""
         luncopy_name = VOL_AND_SNAP_NAME_PREFIX + src_vol_id + '_' + tgt_vol_id
         self._create_luncopy(luncopy_name, src_vol_id, tgt_vol_id)
-        self.luncopy_list.append(luncopy_name)
+        with self.lock_state:
+            self.luncopy_list.append(luncopy_name)
         luncopy_id = self._get_luncopy_info(luncopy_name)[1]
         try:
             self._start_luncopy(luncopy_id)
@@ -950,11 +1065,13 @@ class TseriesClient(object):
             with excutils.save_and_reraise_exception():
                 # Need to remove the LUNcopy of the volume first.
                 self._delete_luncopy(luncopy_id)
-                self.luncopy_list.remove(luncopy_name)
+                with self.lock_state:
+                    self.luncopy_list.remove(luncopy_name)
                 self._delete_volume(tgt_vol_id)
         # Need to delete LUNcopy finally.
         self._delete_luncopy(luncopy_id)
-        self.luncopy_list.remove(luncopy_name)
+        with self.lock_state:
+            self.luncopy_list.remove(luncopy_name)
 
     def _create_luncopy(self, luncopyname, srclunid, tgtlunid):
         """Run CLI command to create LUNcopy."""
@@ -982,7 +1099,7 @@ class TseriesClient(object):
     def _wait_for_luncopy(self, luncopyname):
         """Wait for LUNcopy to complete."""
         while True:
-            luncopy_info = self._get_luncopy_info(luncopyname)
+            luncopy_info = self._get_luncopy_info(luncopyname, refresh=True)
             # If state is complete
             if luncopy_info[3] == 'Complete':
                 break
@@ -997,20 +1114,19 @@ class TseriesClient(object):
 
             time.sleep(10)
 
-    def _get_luncopy_info(self, luncopyname):
+    def _get_luncopy_info(self, luncopyname, refresh=False):
         """Return a LUNcopy information list."""
         cli_cmd = 'showluncopy'
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd, refresh)
 
         self._assert_cli_out(re.search('LUN Copy Information', out),
                              '_get_luncopy_info',
                              'No LUNcopy information was found.',
                              cli_cmd, out)
 
-        for line in out.split('\r\n')[6:-2]:
-            tmp_line = line.split()
-            if tmp_line[0] == luncopyname:
-                return tmp_line
+        for luncopy in parse_cli_table(out, min_columns=1):
+            if luncopy[0] == luncopyname:
+                return luncopy
         return None
 
     def _delete_luncopy(self, luncopyid):
@@ -1022,6 +1138,7 @@ class TseriesClient(object):
                                      'Failed to delete LUNcopy %s' % luncopyid,
                                      cli_cmd, out)
 
+    @query_scope
     def create_cloned_volume(self, tgt_volume, src_volume):
         src_vol_id = self.check_volume_exist_on_array(src_volume)
         if not src_vol_id:
@@ -1062,16 +1179,14 @@ class TseriesClient(object):
 
     def _get_all_luns_info(self):
         cli_cmd = 'showlun'
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         luns = []
         if re.search('LUN Information', out):
-            for line in out.split('\r\n')[6:-2]:
-                new_line = line.replace('Not format', 'Notformat').split()
-                if len(new_line) < 7:
-                    err_msg = (_('CLI out is not normal. CLI out: %s') % out)
-                    LOG.error(err_msg)
-                    raise exception.VolumeBackendAPIException(data=err_msg)
-                luns.append(new_line)
+            luns = parse_cli_table(out.replace('Not format', 'Notformat'))
+            if any(len(lun) < 7 for lun in luns):
+                err_msg = (_('CLI out is not normal. CLI out: %s') % out)
+                LOG.error(err_msg)
+                raise exception.VolumeBackendAPIException(data=err_msg)
         return luns
 
     def _get_lun_id(self, lun_name):
@@ -1085,7 +1200,7 @@ class TseriesClient(object):
     def _get_lun_status(self, lun_id):
         status = None
         cli_cmd = ('showlun -lun %s' % lun_id)
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd, refresh=True)
         if re.search('LUN Information', out):
             try:
                 line = out.split('\r\n')[7]
@@ -1121,6 +1236,7 @@ class TseriesClient(object):
             LOG.info(_LI('LUN %s is not ready, waiting 2s...'), lun_id)
             time.sleep(2)
 
+    @query_scope
     def extend_volume(self, volume, new_size):
         lun_id = self.check_volume_exist_on_array(volume)
         if not lun_id:
@@ -1172,7 +1288,8 @@ class TseriesClient(object):
                                       % extended_vol_id),
                                      cli_cmd, out)
 
-    @utils.synchronized('huawei', external=False)
+    @query_scope
+    @synchronized('huawei-{snapshot[volume_name]}')
     def create_snapshot(self, snapshot):
         snapshot_name = self._name_translate(snapshot['name'])
         volume_name = self._name_translate(snapshot['volume_name'])
@@ -1210,13 +1327,10 @@ class TseriesClient(object):
     def _resource_pool_enough(self):
         """Check whether resource pools' valid size is more than 1GB."""
         cli_cmd = 'showrespool'
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         try:
-            for line in out.split('\r\n')[6:-2]:
-                tmp_line = line.split()
-                if len(tmp_line) < 4:
-                    continue
-                if float(tmp_line[3]) < 1024.0:
+            for pool in parse_cli_table(out, min_columns=4):
+                if float(pool[3]) < 1024.0:
                     return False
         except Exception:
             err_msg = (_('CLI out is not normal. CLI out: %s') % out)
@@ -1239,15 +1353,12 @@ class TseriesClient(object):
 
     def _get_snapshot_id(self, snapshotname):
         cli_cmd = 'showsnapshot'
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         if re.search('Snapshot Information', out):
             try:
-                for line in out.split('\r\n')[6:-2]:
-                    emp_line = line.split()
-                    if len(emp_line) < 2:
-                        continue
-                    if emp_line[0] == snapshotname:
-                        return emp_line[1]
+                for snapshot in parse_cli_table(out, min_columns=2):
+                    if snapshot[0] == snapshotname:
+                        return snapshot[1]
             except Exception:
                 err_msg = (_('CLI out is not normal. CLI out: %s') % out)
                 LOG.error(err_msg)
@@ -1265,6 +1376,8 @@ class TseriesClient(object):
                                       % snapshotid),
                                      cli_cmd, out)
 
+    @query_scope
+    @synchronized('huawei-{snapshot[name]}')
     def delete_snapshot(self, snapshot):
         snapshot_name = self._name_translate(snapshot['name'])
         volume_name = self._name_translate(snapshot['volume_name'])
@@ -1293,7 +1406,7 @@ class TseriesClient(object):
 
     def _check_snapshot_created(self, snapshot_id):
         cli_cmd = 'showsnapshot -snapshot %(snap)s' % {'snap': snapshot_id}
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         if re.search('Snapshot Information', out):
             return True
         elif re.search('Current LUN is not a LUN snapshot', out):
@@ -1304,7 +1417,9 @@ class TseriesClient(object):
             raise exception.VolumeBackendAPIException(data=msg)
 
     def _snapshot_in_luncopy(self, snapshot_id):
-        for name in self.luncopy_list:
+        with self.lock_state:
+            luncopy_list = list(self.luncopy_list)
+        for name in luncopy_list:
             if name.startswith(VOL_AND_SNAP_NAME_PREFIX + snapshot_id):
                 return True
         return False
@@ -1354,7 +1469,7 @@ class TseriesClient(object):
     def _is_lun_normal(self, lun_id):
         """Check whether the LUN is normal."""
         cli_cmd = ('showlun -lun %s' % lun_id)
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd, refresh=True)
         if re.search('LUN Information', out):
             try:
                 line = out.split('\r\n')[7]
@@ -1373,6 +1488,7 @@ class TseriesClient(object):
 
         return False
 
+    @query_scope
     def map_volume(self, host_id, lun_id):
         """Map a volume to a host."""
         # Map a LUN to a host if not mapped.
@@ -1420,6 +1536,7 @@ class TseriesClient(object):
 
         return hostlun_id
 
+    @query_scope
     def add_host(self, host_name, host_ip, initiator=None):
         """Create a host and add it to hostgroup."""
         # Create an OpenStack hostgroup if not created before.
@@ -1472,15 +1589,12 @@ class TseriesClient(object):
         """
 
         cli_cmd = 'showhostgroup'
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         if re.search('Host Group Information', out):
             try:
-                for line in out.split('\r\n')[6:-2]:
-                    tmp_line = line.split()
-                    if len(tmp_line) < 2:
-                        continue
-                    if tmp_line[1] == groupname:
-                        return tmp_line[0]
+                for hostgroup in parse_cli_table(out, min_columns=2):
+                    if hostgroup[1] == groupname:
+                        return hostgroup[0]
             except Exception:
                 err_msg = (_('CLI out is not normal. CLI out: %s') % out)
                 LOG.error(err_msg)
@@ -1500,15 +1614,12 @@ class TseriesClient(object):
     def _get_host_id(self, hostname, hostgroupid):
         """Get the given host ID."""
         cli_cmd = 'showhost -group %(groupid)s' % {'groupid': hostgroupid}
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         if re.search('Host Information', out):
             try:
-                for line in out.split('\r\n')[6:-2]:
-                    tmp_line = line.split()
-                    if len(tmp_line) < 2:
-                        continue
-                    if tmp_line[1] == hostname:
-                        return tmp_line[0]
+                for host in parse_cli_table(out, min_columns=2):
+                    if host[1] == hostname:
+                        return host[0]
             except Exception:
                 err_msg = (_('CLI out is not normal. CLI out: %s') % out)
                 LOG.error(err_msg)
@@ -1530,9 +1641,9 @@ class TseriesClient(object):
     def get_host_port_info(self, hostid):
         """Run CLI command to get host port information."""
         cli_cmd = ('showhostport -host %(hostid)s' % {'hostid': hostid})
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         if re.search('Host Port Information', out):
-            return [line.split() for line in out.split('\r\n')[6:-2]]
+            return parse_cli_table(out)
         else:
             return None
 
@@ -1540,15 +1651,10 @@ class TseriesClient(object):
         """Get map information of the given host."""
 
         cli_cmd = 'showhostmap -host %(hostid)s' % {'hostid': hostid}
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         if re.search('Map Information', out):
-            mapinfo = []
             try:
-                for line in out.split('\r\n')[6:-2]:
-                    new_line = line.split()
-                    if len(new_line) < 5:
-                        continue
-                    mapinfo.append(new_line)
+                mapinfo = parse_cli_table(out, min_columns=5)
             except Exception:
                 err_msg = (_('CLI out is not normal. CLI out: %s') % out)
                 LOG.error(err_msg)
@@ -1562,15 +1668,10 @@ class TseriesClient(object):
         """Get map information of the given host."""
 
         cli_cmd = 'showhostmap -lun %(lunid)s' % {'lunid': lunid}
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         if re.search('Map Information', out):
-            mapinfo = []
             try:
-                for line in out.split('\r\n')[6:-2]:
-                    new_line = line.split()
-                    if len(new_line) < 5:
-                        continue
-                    mapinfo.append(new_line)
+                mapinfo = parse_cli_table(out, min_columns=5)
             except Exception:
                 err_msg = (_('CLI out is not normal. CLI out: %s') % out)
                 LOG.error(err_msg)
@@ -1582,7 +1683,7 @@ class TseriesClient(object):
 
     def get_lun_details(self, lun_id):
         cli_cmd = 'showlun -lun %s' % lun_id
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
         lun_details = {}
         if re.search('LUN Information', out):
             try:
@@ -1611,6 +1712,7 @@ class TseriesClient(object):
                                      'LUN %s' % lun_id,
                                      cli_cmd, out)
 
+    @query_scope
     def get_host_id(self, host_name, initiator=None):
         # Check the old host name to support the upgrade from grizzly to
         # higher versions.
@@ -1630,6 +1732,7 @@ class TseriesClient(object):
 
         return host_id
 
+    @query_scope
     def remove_map(self, lun_id, host_id):
         """Remove host map."""
         if host_id is None:
@@ -1784,6 +1887,7 @@ class TseriesClient(object):
 
         return pool_info
 
+    @query_scope
     def _update_volume_stats(self):
         """Retrieve stats info from volume group."""
 
@@ -1833,20 +1937,19 @@ class TseriesClient(object):
         """
 
         cli_cmd = ('showpool' if pooltype == 'Thin' else 'showrg')
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
 
         test = (re.search('Pool Information', out) or
                 re.search('RAID Group Information', out))
         if test:
-            pool = out.split('\r\n')[6:-2]
-            return [line.split() for line in pool]
+            return parse_cli_table(out)
 
         return []
 
     def get_pool_details(self, pooltype, pool_id):
         cli_cmd = ('showpool -pool ' if pooltype == 'Thin' else 'showrg -rg ')
         cli_cmd += '%s' % pool_id
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
 
         test = (re.search('Pool Information', out) or
                 re.search('RAID Group Information', out))
@@ -1885,7 +1988,7 @@ class TseriesClient(object):
 
     def _get_disk_info(self, info_type='logic'):
         cli_cmd = 'showdisk -' + info_type
-        out = self._execute_cli(cli_cmd)
+        out = self._query_cli(cli_cmd)
 
         test = re.search('Disk Information', out)
         self._assert_cli_out(test, '_get_disk_info',
@@ -13,12 +13,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import six
+import threading
+import time
 import uuid
 import re
+import weakref
 
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_service import loopingcall
 
 from cinder import exception
 from cinder.i18n import _
@@ -51,6 +56,22 @@ CONF = cfg.CONF
 CONF.register_opts(huawei_opts)
 
 
+def _get_block_pools(client):
+    # File system pools may share the names of block pools, skip them.
+    return [p for p in client.get_all_pools()
+            if p.get('USAGETYPE', constants.BLOCK_POOL_TYPE) ==
+            constants.BLOCK_POOL_TYPE]
+
+
+def _refresh_driver_stats(driver_ref):
+    # The looping call only holds a weak reference of the driver, so a
+    # driver dropped without stop_stats_refresher still ends the loop.
+    driver = driver_ref()
+    if not driver:
+        raise loopingcall.LoopingCallDone()
+    driver._refresh_volume_stats()
+
+
 class HuaweiBaseDriver(object):
     VERSION = "1.0.0"
 
@@ -70,6 +91,13 @@ class HuaweiBaseDriver(object):
         self.hypermetro_rmt_cli = None
         self.replication_rmt_cli = None
         self.support_capability = {}
+        self._capability_updated_at = None
+        self._stats_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stats_snapshot = {}
+        self._stats_updated_at = None
+        self._stats_refresher = None
+        self.attach_coalescer = huawei_utils.BatchCoalescer()
 
     def do_setup(self, context):
         self.conf.update_config_value()
@@ -80,7 +108,10 @@ class HuaweiBaseDriver(object):
             self.configuration.san_password,
             self.configuration.vstore_name,
             self.configuration.ssl_cert_verify,
-            self.configuration.ssl_cert_path)
+            self.configuration.ssl_cert_path,
+            self.configuration.rest_pool_connections,
+            self.configuration.rest_pool_maxsize,
+            self.configuration.rest_pool_block)
         self.local_cli.login()
 
         if self.configuration.hypermetro:
@@ -89,6 +120,9 @@ class HuaweiBaseDriver(object):
                 self.configuration.hypermetro['san_user'],
                 self.configuration.hypermetro['san_password'],
                 self.configuration.hypermetro['vstore_name'],
+                pool_connections=self.configuration.rest_pool_connections,
+                pool_maxsize=self.configuration.rest_pool_maxsize,
+                pool_block=self.configuration.rest_pool_block,
             )
             self.hypermetro_rmt_cli.login()
 
@@ -98,15 +132,15 @@ class HuaweiBaseDriver(object):
                 self.configuration.replication['san_user'],
                 self.configuration.replication['san_password'],
                 self.configuration.replication['vstore_name'],
+                pool_connections=self.configuration.rest_pool_connections,
+                pool_maxsize=self.configuration.rest_pool_maxsize,
+                pool_block=self.configuration.rest_pool_block,
             )
             self.replication_rmt_cli.login()
 
     def check_for_setup_error(self):
         def _check_storage_pools(client, config_pools):
-            pools = client.get_all_pools()
-            pool_names = [p['NAME'] for p in pools if
-                          p.get('USAGETYPE', constants.BLOCK_POOL_TYPE) ==
-                          constants.BLOCK_POOL_TYPE]
+            pool_names = [p['NAME'] for p in _get_block_pools(client)]
 
             for pool_name in config_pools:
                 if pool_name not in pool_names:
@@ -125,10 +159,11 @@ class HuaweiBaseDriver(object):
                 self.configuration.replication['storage_pools'])
 
         # If host is failed-over, switch the local and remote client.
-        if (self.configuration.replication and self.active_backend_id ==
-                self.configuration.replication['backend_id']):
+        if self._is_failed_over():
             self._switch_replication_clients()
 
+        self._start_stats_refresher()
+
     def backup_use_temp_snapshot(self):
         return self.configuration.safe_get("backup_use_temp_snapshot")
 
@@ -170,6 +205,9 @@ class HuaweiBaseDriver(object):
         def _get_smarttier(disk_type):
             return disk_type is not None and disk_type == ['mix']
 
+        pool_infos = dict((p['NAME'], p)
+                          for p in _get_block_pools(self.local_cli))
+
         pools = []
         for pool_name in self.configuration.storage_pools:
             pool = {
@@ -206,7 +244,7 @@ class HuaweiBaseDriver(object):
             if self.configuration.san_product == "Dorado":
                 pool['huawei_application_type'] = True
 
-            pool_info = self.local_cli.get_pool_by_name(pool_name)
+            pool_info = pool_infos.get(pool_name)
             if pool_info:
                 total_capacity, free_capacity = _get_capacity(pool_info)
                 disk_type = _get_disk_type(pool_info)
@@ -223,60 +261,177 @@ class HuaweiBaseDriver(object):
 
         return pools
 
+    def invalidate_support_capability(self):
+        """Detect the backend capabilities again at next stats refresh.
+
+        Should be called when the license of array is changed.
+        """
+        self._capability_updated_at = None
+
+    def _drop_mapping_topologies(self):
+        for client in (self.local_cli, self.hypermetro_rmt_cli,
+                       self.replication_rmt_cli):
+            if client:
+                client.mapping_topology.clear()
+
     def _update_support_capability(self):
+        # Licenses rarely change, so the detected capabilities are kept for
+        # CAPABILITY_CACHE_TTL instead of probing each feature every time.
+        if (self._capability_updated_at and time.time() <
+                self._capability_updated_at + constants.CAPABILITY_CACHE_TTL):
+            return
+
+        for client in (self.local_cli, self.hypermetro_rmt_cli,
+                       self.replication_rmt_cli):
+            if client:
+                client.invalidate_cache('feature_status')
+
+        support_capability = {}
         feature_status = self.local_cli.get_feature_status()
 
         for c in constants.CHECK_FEATURES:
-            self.support_capability[c] = False
+            support_capability[c] = False
             for f in feature_status:
                 if re.match(c, f):
-                    self.support_capability[c] = (
+                    support_capability[c] = (
                         feature_status[f] in
                         constants.AVAILABLE_FEATURE_STATUS)
                     break
             else:
                 if constants.CHECK_FEATURES[c]:
-                    self.support_capability[c] = self.local_cli.check_feature(
+                    support_capability[c] = self.local_cli.check_feature(
                         constants.CHECK_FEATURES[c])
 
         if self.hypermetro_rmt_cli:
             feature_status = self.hypermetro_rmt_cli.get_feature_status()
             if (feature_status.get('HyperMetro') not in
                     constants.AVAILABLE_FEATURE_STATUS):
-                    self.support_capability['HyperMetro'] = False
+                    support_capability['HyperMetro'] = False
         else:
-            self.support_capability['HyperMetro'] = False
+            support_capability['HyperMetro'] = False
 
         if self.replication_rmt_cli:
             feature_status = self.replication_rmt_cli.get_feature_status()
             if (feature_status.get('HyperReplication') not in
                     constants.AVAILABLE_FEATURE_STATUS):
-                    self.support_capability['HyperReplication'] = False
+                    support_capability['HyperReplication'] = False
         else:
-            self.support_capability['HyperReplication'] = False
+            support_capability['HyperReplication'] = False
 
+        # Update in one step, so running flows never see a half detected
+        # capability map.
+        self.support_capability.update(support_capability)
+        self._capability_updated_at = time.time()
         LOG.debug('Update backend capabilities: %s.', self.support_capability)
 
+    def _reload_config(self):
+        changed = self.conf.update_config_value()
+        if changed:
+            # The arrays or their licenses may differ after the config
+            # changed, so detect the capabilities and map hosts again.
+            self.invalidate_support_capability()
+            self._drop_mapping_topologies()
+        if 'Storage' not in changed:
+            return
+
+        # The REST pool options apply to the connections of every array.
+        pool_options = {
+            'pool_connections': self.configuration.rest_pool_connections,
+            'pool_maxsize': self.configuration.rest_pool_maxsize,
+            'pool_block': self.configuration.rest_pool_block,
+        }
+
+        # Credentials of the XML config belong to the primary array, which
+        # is the replication remote client after failover.
+        if self._is_failed_over():
+            client = self.replication_rmt_cli
+            options = dict(pool_options)
+        else:
+            client = self.local_cli
+            options = dict(pool_options,
+                           ssl_verify=self.configuration.ssl_cert_verify,
+                           cert_path=self.configuration.ssl_cert_path)
+        client.update_credentials(
+            self.configuration.san_address,
+            self.configuration.san_user,
+            self.configuration.san_password,
+            self.configuration.vstore_name,
+            **options)
+
+        for other in (self.local_cli, self.hypermetro_rmt_cli,
+                      self.replication_rmt_cli):
+            if other and other is not client:
+                other.update_credentials(
+                    other.san_address, other.san_user, other.san_password,
+                    other.vstore_name, **pool_options)
+
     def _update_volume_stats(self):
+        """Reload huawei config file and refresh the stats snapshot."""
+        self._reload_config()
         self._update_support_capability()
         pools = self._update_pool_stats()
 
-        self._stats['pools'] = pools
-        self._stats['volume_backend_name'] = (
+        stats = {}
+        stats['pools'] = pools
+        stats['volume_backend_name'] = (
             self.configuration.safe_get('volume_backend_name') or
             self.__class__.__name__)
-        self._stats['driver_version'] = self.VERSION
-        self._stats['vendor_name'] = 'Huawei'
-        self._stats['replication_enabled'] = (
+        stats['driver_version'] = self.VERSION
+        stats['vendor_name'] = 'Huawei'
+        stats['replication_enabled'] = (
             self.support_capability['HyperReplication'])
-        if self._stats['replication_enabled']:
-            self._stats['replication_targets'] = (
+        if stats['replication_enabled']:
+            stats['replication_targets'] = (
                 [self.configuration.replication['backend_id']])
 
+        with self._stats_lock:
+            self._stats_snapshot = stats
+            self._stats_updated_at = time.time()
+
+    def _refresh_volume_stats(self):
+        try:
+            with self._refresh_lock:
+                self._update_volume_stats()
+        except Exception:
+            LOG.exception('Refresh volume stats failed, keep the stats '
+                          'updated at %s.', self._stats_updated_at)
+
+    def _start_stats_refresher(self):
+        if self._stats_refresher:
+            return
+
+        self._stats_refresher = loopingcall.FixedIntervalLoopingCall(
+            functools.partial(_refresh_driver_stats, weakref.ref(self)))
+        self._stats_refresher.start(
+            interval=constants.STATS_REFRESH_INTERVAL,
+            initial_delay=constants.STATS_REFRESH_INTERVAL)
+
+    def stop_stats_refresher(self):
+        if self._stats_refresher:
+            self._stats_refresher.stop()
+            self._stats_refresher = None
+
     def get_volume_stats(self):
-        """Get volume status and reload huawei config file."""
-        self.conf.update_config_value()
-        self._update_volume_stats()
+        """Get volume status from the snapshot refreshed in background.
+
+        The stats are only queried synchronously before the first snapshot
+        exists, and never at the same time as the background refresh.
+        """
+        if not self._stats_updated_at:
+            with self._refresh_lock:
+                # The refresher may have taken the first snapshot meanwhile.
+                if not self._stats_updated_at:
+                    self._update_volume_stats()
+
+        with self._stats_lock:
+            self._stats.update(self._stats_snapshot)
+            if not self._stats_snapshot.get('replication_enabled'):
+                self._stats.pop('replication_targets', None)
+            stats_age = time.time() - self._stats_updated_at
+
+        if stats_age > constants.STATS_REFRESH_INTERVAL * 2:
+            LOG.warning('Report volume stats updated %d seconds ago.',
+                        stats_age)
 
     def create_volume(self, volume):
         (lun_id, lun_wwn, hypermetro_id, replication_id
@@ -549,16 +704,17 @@ class HuaweiBaseDriver(object):
 
         model_update = {'status': fields.GroupStatus.DELETED}
 
-        volumes_model_update = []
-        for volume in volumes:
+        def _delete_volume(volume):
             update = {'id': volume.id}
             try:
                 self.delete_volume(volume)
                 update['status'] = 'deleted'
             except Exception:
                 update['status'] = 'error_deleting'
-            finally:
-                volumes_model_update.append(update)
+            return update
+
+        futures = huawei_utils.execute_in_parallel(_delete_volume, volumes)
+        volumes_model_update = [future.result() for future in futures]
 
         return model_update, volumes_model_update
 
@@ -599,20 +755,25 @@ class HuaweiBaseDriver(object):
         return model_update, snapshots_model_update
 
     def _create_group_snapshot(self, snapshots):
-        snapshots_model_update = []
-        created_snapshots = []
+        def _create_snapshot(snapshot):
+            return huawei_flow.create_snapshot(
+                snapshot, self.local_cli, self.support_capability)
 
-        for snapshot in snapshots:
-            try:
-                snapshot_id, snapshot_wwn = huawei_flow.create_snapshot(
-                    snapshot, self.local_cli, self.support_capability)
-            except Exception:
-                LOG.exception("Failed to create snapshot %s of group.",
-                              snapshot.id)
-                for snap_id in created_snapshots:
-                    self.local_cli.delete_snapshot(snap_id)
-                raise
+        futures = huawei_utils.execute_in_parallel(_create_snapshot,
+                                                   snapshots)
 
+        snapshots_model_update = []
+        created_snapshots = []
+        error = None
+        for snapshot, future in zip(snapshots, futures):
+            if future.exception():
+                LOG.error("Failed to create snapshot %(id)s of group: "
+                          "%(err)s.",
+                          {'id': snapshot.id, 'err': future.exception()})
+                error = error or future.exception()
+                continue
+
+            snapshot_id, snapshot_wwn = future.result()
             location = huawei_utils.to_string(
                 huawei_snapshot_id=snapshot_id,
                 huawei_snapshot_wwn=snapshot_wwn)
@@ -624,6 +785,11 @@ class HuaweiBaseDriver(object):
             snapshots_model_update.append(snap_model_update)
             created_snapshots.append(snapshot_id)
 
+        if error:
+            for snap_id in created_snapshots:
+                self.local_cli.delete_snapshot(snap_id)
+            raise error
+
         try:
             self.local_cli.activate_snapshot(created_snapshots)
         except Exception:
@@ -647,17 +813,25 @@ class HuaweiBaseDriver(object):
         return model_update, snapshots_model_update
 
     def _delete_group_snapshot(self, snapshots):
+        futures = huawei_utils.execute_in_parallel(self.delete_snapshot,
+                                                   snapshots)
+
         snapshots_model_update = []
-        for snapshot in snapshots:
-            try:
-                self.delete_snapshot(snapshot)
-                snapshot_model = {'id': snapshot.id,
-                                  'status': fields.SnapshotStatus.DELETED}
-                snapshots_model_update.append(snapshot_model)
-            except Exception:
-                LOG.exception("Failed to delete snapshot %s of group.",
-                              snapshot.id)
-                raise
+        error = None
+        for snapshot, future in zip(snapshots, futures):
+            if future.exception():
+                LOG.error("Failed to delete snapshot %(id)s of group: "
+                          "%(err)s.",
+                          {'id': snapshot.id, 'err': future.exception()})
+                error = error or future.exception()
+                continue
+
+            snapshot_model = {'id': snapshot.id,
+                              'status': fields.SnapshotStatus.DELETED}
+            snapshots_model_update.append(snapshot_model)
+
+        if error:
+            raise error
 
         return snapshots_model_update
 
@@ -690,15 +864,27 @@ class HuaweiBaseDriver(object):
 
         return secondary_id, volumes_update, []
 
+    def _is_failed_over(self):
+        return (self.configuration.replication and self.active_backend_id ==
+                self.configuration.replication['backend_id'])
+
     def _switch_replication_clients(self):
         self.local_cli, self.replication_rmt_cli = (
             self.replication_rmt_cli, self.local_cli)
+        self.invalidate_support_capability()
+        self._drop_mapping_topologies()
         (self.configuration.iscsi_info,
          self.configuration.replication['iscsi_info']) = (
             self.configuration.replication['iscsi_info'],
             self.configuration.iscsi_info
         )
 
+    @staticmethod
+    def _get_connector_key(connector):
+        return (connector['host'], connector.get('initiator'),
+                tuple(sorted(connector.get('wwpns') or [])),
+                bool(connector.get('multipath')))
+
     def _change_same_host_lun_id(self, local_mapping, remote_mapping):
         loc_aval_host_lun_ids = local_mapping.get('aval_host_lun_ids', [])
         rmt_aval_host_lun_ids = remote_mapping.get('aval_host_lun_ids', [])
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import functools
 import ipaddress
 import json
 import re
@@ -38,6 +40,11 @@ from cinder.volume.drivers.huawei import smartx
 
 LOG = logging.getLogger(__name__)
 
+# Objects of a mapped host which are cached for the later attaches.
+ISCSI_TOPOLOGY = ('host_id', 'hostgroup_id', 'lungroup_id', 'mappingview_id')
+FC_TOPOLOGY = ('host_id', 'hostgroup_id', 'lungroup_id', 'portgroup_id',
+               'mappingview_id')
+
 
 class LunOptsCheckTask(task.Task):
     default_provides = 'opts'
@@ -369,6 +376,28 @@ class CheckLunExistTask(task.Task):
         return lun_info, lun_info['ID']
 
 
+class CheckLunsExistTask(task.Task):
+    default_provides = ('lun_infos', 'lun_ids')
+
+    def __init__(self, client, *args, **kwargs):
+        super(CheckLunsExistTask, self).__init__(*args, **kwargs)
+        self.client = client
+
+    def execute(self, volumes):
+        futures = huawei_utils.execute_in_parallel(
+            lambda volume: huawei_utils.get_lun_info(self.client, volume),
+            volumes)
+
+        lun_infos = [future.result() for future in futures]
+        for volume, lun_info in zip(volumes, lun_infos):
+            if not lun_info:
+                msg = _("Volume %s does not exist.") % volume.id
+                LOG.error(msg)
+                raise exception.VolumeBackendAPIException(data=msg)
+
+        return lun_infos, [lun_info['ID'] for lun_info in lun_infos]
+
+
 class GetLunIDTask(task.Task):
     default_provides = 'lun_id'
 
@@ -645,8 +674,7 @@ class WaitLunCopyDoneTask(task.Task):
     def execute(self, luncopy_id):
         self.client.start_luncopy(luncopy_id)
 
-        def _luncopy_done():
-            luncopy = self.client.get_luncopy_info(luncopy_id)
+        def _luncopy_done(luncopy):
             if luncopy['HEALTHSTATUS'] != constants.STATUS_HEALTH:
                 msg = _("Luncopy %s is abnormal.") % luncopy_id
                 LOG.error(msg)
@@ -655,9 +683,8 @@ class WaitLunCopyDoneTask(task.Task):
             return (luncopy['RUNNINGSTATUS'] in
                     constants.LUNCOPY_STATUS_COMPLETE)
 
-        huawei_utils.wait_for_condition(
-            _luncopy_done, constants.DEFAULT_WAIT_INTERVAL,
-            constants.DEFAULT_WAIT_TIMEOUT)
+        self.client.status_poller.wait('luncopy', luncopy_id, _luncopy_done,
+                                       constants.DEFAULT_WAIT_TIMEOUT)
 
         self.client.delete_luncopy(luncopy_id)
 
@@ -778,20 +805,19 @@ class WaitSnapshotReadyTask(task.Task):
         self.client = client
 
     def execute(self, snapshot_id):
-        def _snapshot_ready():
-            self.snapshot = self.client.get_snapshot_info_by_id(snapshot_id)
-            if self.snapshot['HEALTHSTATUS'] != constants.STATUS_HEALTH:
+        def _snapshot_ready(snapshot):
+            if snapshot['HEALTHSTATUS'] != constants.STATUS_HEALTH:
                 msg = _("Snapshot %s is fault.") % snapshot_id
                 LOG.error(msg)
                 raise exception.VolumeBackendAPIException(data=msg)
 
-            return not (self.snapshot['RUNNINGSTATUS'] ==
+            return not (snapshot['RUNNINGSTATUS'] ==
                         constants.SNAPSHOT_INITIALIZING)
 
-        huawei_utils.wait_for_condition(_snapshot_ready,
-                                        constants.DEFAULT_WAIT_INTERVAL,
-                                        constants.DEFAULT_WAIT_INTERVAL * 10)
-        return self.snapshot['WWN']
+        snapshot = self.client.status_poller.wait(
+            'snapshot', snapshot_id, _snapshot_ready,
+            constants.DEFAULT_WAIT_INTERVAL * 10)
+        return snapshot['WWN']
 
 
 class DeleteSnapshotTask(task.Task):
@@ -1210,25 +1236,41 @@ class GetISCSIConnectionTask(task.Task):
         iqn_info = port_id.split(',', 1)[0]
         return iqn_info.split('+')[1]
 
-    def execute(self, connector):
+    def _build_ip_iqn_map(self):
         ip_iqn_map = {}
         target_ports = self.client.get_iscsi_tgt_ports()
         for port in target_ports:
             ip = self._get_port_ip(port['ID'])
             normalized_ip = ipaddress.ip_address(six.text_type(ip)).exploded
-            ip_iqn_map[normalized_ip] = (port['ID'], port['ETHPORTID'])
+            ip_iqn_map[normalized_ip] = (self._get_port_iqn(port['ID']),
+                                         port['ETHPORTID'])
+        return ip_iqn_map
+
+    def _get_ip_iqn_map(self, refresh=False):
+        # The target ports are cached in client, and refreshed when the
+        # cache expires or a configured ip is not found.
+        if refresh:
+            self.client.invalidate_cache('iscsi_tgt_port_map')
+        return self.client.cache.get(('iscsi_tgt_port_map',),
+                                     self._build_ip_iqn_map)
 
+    def execute(self, connector):
         config_info = huawei_utils.find_config_info(self.iscsi_info,
                                                     connector=connector)
         config_ips = self._get_config_target_ips(config_info)
         LOG.info('Configured iscsi ips %s.', config_ips)
 
+        ip_addrs = [ipaddress.ip_address(six.text_type(ip))
+                    for ip in config_ips]
+        ip_iqn_map = self._get_ip_iqn_map()
+        if any(ip_addr.exploded not in ip_iqn_map for ip_addr in ip_addrs):
+            ip_iqn_map = self._get_ip_iqn_map(refresh=True)
+
         target_ips = []
         target_iqns = []
         target_eths = []
 
-        for ip in config_ips:
-            ip_addr = ipaddress.ip_address(six.text_type(ip))
+        for ip_addr in ip_addrs:
             normalized_ip = ip_addr.exploded
             if normalized_ip in ip_iqn_map:
                 if ip_addr.version == 6:
@@ -1236,9 +1278,9 @@ class GetISCSIConnectionTask(task.Task):
                 else:
                     target_ips.append(ip_addr.compressed)
 
-                iqn = self._get_port_iqn(ip_iqn_map[normalized_ip][0])
+                iqn, eth_id = ip_iqn_map[normalized_ip]
                 target_iqns.append(iqn)
-                target_eths.append(ip_iqn_map[normalized_ip][1])
+                target_eths.append(eth_id)
 
         if not target_ips or not target_iqns or not target_eths:
             msg = _('Get iSCSI target ip&iqn&eth error.')
@@ -1357,25 +1399,114 @@ class CreateMappingViewTask(task.Task):
 
     def execute(self, lun_id, lun_type, host_id, hostgroup_id, lungroup_id,
                 portgroup_id=None):
-        mappingview_name = constants.MAPPING_VIEW_PREFIX + host_id
-        mappingview_id = self.client.create_mappingview(mappingview_name)
-        self.client.associate_hostgroup_to_mappingview(
-            mappingview_id, hostgroup_id)
-        self.client.associate_lungroup_to_mappingview(
-            mappingview_id, lungroup_id)
-        if portgroup_id:
-            self.client.associate_portgroup_to_mappingview(
-                mappingview_id, portgroup_id)
+        mappingview_id = _create_mapping_view(
+            self.client, host_id, hostgroup_id, lungroup_id, portgroup_id)
+        hostlun_id, aval_host_lun_ids = _get_host_lun_id(
+            self.client, lun_id, lun_type, host_id, mappingview_id)
+        return mappingview_id, hostlun_id, aval_host_lun_ids
 
-        if lun_type == constants.LUN_TYPE:
-            hostlun_id = self.client.get_lun_host_lun_id(host_id, lun_id)
-        else:
-            hostlun_id = self.client.get_snapshot_host_lun_id(host_id, lun_id)
 
-        mappingview_info = self.client.get_mappingview_by_id(mappingview_id)
-        aval_host_lun_ids = json.loads(
-            mappingview_info['AVAILABLEHOSTLUNIDLIST'])
-        return mappingview_id, hostlun_id, aval_host_lun_ids
+class CreateBatchMappingViewTask(task.Task):
+    default_provides = ('mappingview_id', 'hostlun_ids', 'aval_host_lun_ids')
+
+    def __init__(self, client, *args, **kwargs):
+        super(CreateBatchMappingViewTask, self).__init__(*args, **kwargs)
+        self.client = client
+
+    def execute(self, lun_ids, host_id, hostgroup_id, lungroup_id,
+                portgroup_id=None):
+        mappingview_id = _create_mapping_view(
+            self.client, host_id, hostgroup_id, lungroup_id, portgroup_id)
+        hostlun_ids, aval_host_lun_ids = _get_host_lun_ids(
+            self.client, lun_ids, host_id, mappingview_id)
+        return mappingview_id, hostlun_ids, aval_host_lun_ids
+
+
+class AddLunToLunGroupTask(task.Task):
+    def __init__(self, client, *args, **kwargs):
+        super(AddLunToLunGroupTask, self).__init__(*args, **kwargs)
+        self.client = client
+
+    def execute(self, lungroup_id, lun_id, lun_type):
+        self.client.associate_lun_to_lungroup(lungroup_id, lun_id, lun_type)
+
+    def revert(self, result, lungroup_id, lun_id, lun_type, **kwargs):
+        if isinstance(result, failure.Failure):
+            return
+        self.client.remove_lun_from_lungroup(lungroup_id, lun_id, lun_type)
+
+
+class AddLunsToLunGroupTask(task.Task):
+    def __init__(self, client, *args, **kwargs):
+        super(AddLunsToLunGroupTask, self).__init__(*args, **kwargs)
+        self.client = client
+
+    def _remove_luns(self, lungroup_id, lun_ids, lun_type):
+        for lun_id in lun_ids:
+            self.client.remove_lun_from_lungroup(lungroup_id, lun_id, lun_type)
+
+    def _add_luns(self, lungroup_id, lun_ids, lun_type):
+        futures = huawei_utils.execute_in_parallel(
+            lambda lun_id: self.client.associate_lun_to_lungroup(
+                lungroup_id, lun_id, lun_type),
+            lun_ids)
+
+        # Revert won't be called for the failed task itself, so remove the
+        # luns already added here.
+        errors = [future.exception() for future in futures
+                  if future.exception()]
+        if errors:
+            added_lun_ids = [lun_id for lun_id, future in zip(lun_ids, futures)
+                             if not future.exception()]
+            self._remove_luns(lungroup_id, added_lun_ids, lun_type)
+            raise errors[0]
+
+    def execute(self, lungroup_id, lun_ids, lun_type):
+        self._add_luns(lungroup_id, lun_ids, lun_type)
+
+    def revert(self, result, lungroup_id, lun_ids, lun_type, **kwargs):
+        if isinstance(result, failure.Failure):
+            return
+        self._remove_luns(lungroup_id, lun_ids, lun_type)
+
+
+class CreateBatchLunGroupTask(AddLunsToLunGroupTask):
+    default_provides = 'lungroup_id'
+
+    def execute(self, host_id, lun_ids, lun_type):
+        lungroup_name = constants.LUNGROUP_PREFIX + host_id
+        lungroup_id = self.client.create_lungroup(lungroup_name)
+        self._add_luns(lungroup_id, lun_ids, lun_type)
+        return lungroup_id
+
+    def revert(self, result, lun_ids, lun_type, **kwargs):
+        if isinstance(result, failure.Failure):
+            return
+        self._remove_luns(result, lun_ids, lun_type)
+
+
+class GetHostLunIDTask(task.Task):
+    default_provides = ('hostlun_id', 'aval_host_lun_ids')
+
+    def __init__(self, client, *args, **kwargs):
+        super(GetHostLunIDTask, self).__init__(*args, **kwargs)
+        self.client = client
+
+    def execute(self, lun_id, lun_type, host_id, mappingview_id):
+        return _get_host_lun_id(
+            self.client, lun_id, lun_type, host_id, mappingview_id)
+
+
+class GetHostLunIDsTask(task.Task):
+    default_provides = ('hostlun_ids', 'aval_host_lun_ids')
+
+    def __init__(self, client, *args, **kwargs):
+        super(GetHostLunIDsTask, self).__init__(*args, **kwargs)
+        self.client = client
+
+    def execute(self, lun_ids, host_id, mappingview_id):
+        return _get_host_lun_ids(
+            self.client, lun_ids, host_id, mappingview_id)
 
 
 class GetISCSIPropertiesTask(task.Task):
@@ -1384,37 +1515,21 @@ class GetISCSIPropertiesTask(task.Task):
     def execute(self, connector, hostlun_id, target_iqns, target_ips,
                 chap_info, mappingview_id, aval_host_lun_ids, lun_id,
                 lun_info):
-        hostlun_id = int(hostlun_id)
-        mapping_info = {
-            'target_discovered': False,
-            'hostlun_id': hostlun_id,
-            'mappingview_id': mappingview_id,
-            'aval_host_lun_ids': aval_host_lun_ids,
-            'lun_id': lun_id,
-        }
-
-        if connector.get('multipath'):
-            mapping_info.update({
-                'target_iqns': target_iqns,
-                'target_portals': ['%s:3260' % ip for ip in target_ips],
-                'target_luns': [hostlun_id] * len(target_ips),
-            })
-        else:
-            mapping_info.update({
-                'target_iqn': target_iqns[0],
-                'target_portal': '%s:3260' % target_ips[0],
-                'target_lun': hostlun_id,
-            })
+        return _get_iscsi_mapping_info(
+            connector, hostlun_id, target_iqns, target_ips, chap_info,
+            mappingview_id, aval_host_lun_ids, lun_id, lun_info)
 
-        if chap_info:
-            mapping_info['auth_method'] = 'CHAP'
-            mapping_info['auth_username'] = chap_info['CHAPNAME']
-            mapping_info['auth_password'] = chap_info['CHAPPASSWORD']
 
-        if lun_info.get('ALLOCTYPE') == constants.THIN_LUNTYPE:
-            mapping_info['discard'] = True
+class GetBatchISCSIPropertiesTask(task.Task):
+    default_provides = 'mapping_infos'
 
-        return mapping_info
+    def execute(self, connector, hostlun_ids, target_iqns, target_ips,
+                chap_info, mappingview_id, aval_host_lun_ids, lun_ids,
+                lun_infos):
+        return [_get_iscsi_mapping_info(
+            connector, hostlun_ids[lun_id], target_iqns, target_ips,
+            chap_info, mappingview_id, aval_host_lun_ids, lun_id, lun_info)
+            for lun_id, lun_info in zip(lun_ids, lun_infos)]
 
 
 class GetHyperMetroRemoteLunTask(task.Task):
@@ -1485,8 +1600,10 @@ class ClearLunMappingTask(task.Task):
 
         eth_ports = self.client.get_eth_ports_in_portgroup(portgroup_id)
         fc_ports = self.client.get_fc_ports_in_portgroup(portgroup_id)
-        for p in [p['ID'] for p in eth_ports] + [p['ID'] for p in fc_ports]:
-            self.client.remove_port_from_portgroup(portgroup_id, p)
+        port_ids = [p['ID'] for p in eth_ports] + [p['ID'] for p in fc_ports]
+        _run_in_parallel(
+            functools.partial(self.client.remove_port_from_portgroup,
+                              portgroup_id, p) for p in port_ids)
         self.client.delete_portgroup(portgroup_id)
 
     def _delete_lungroup(self, mappingview_id, lungroup_id):
@@ -1500,16 +1617,16 @@ class ClearLunMappingTask(task.Task):
         self.client.remove_host_from_hostgroup(hostgroup_id, host_id)
         self.client.delete_hostgroup(hostgroup_id)
 
-    def _delete_host(self, host_id):
+    def _remove_host_initiators(self, host_id):
         iscsi_initiators = self.client.get_host_iscsi_initiators(host_id)
-        for ini in iscsi_initiators:
-            self.client.remove_iscsi_initiator_from_host(ini)
-
         fc_initiators = self.client.get_host_fc_initiators(host_id)
-        for ini in fc_initiators:
-            self.client.remove_fc_initiator_from_host(ini)
-
-        self.client.delete_host(host_id)
+        funcs = [functools.partial(
+            self.client.remove_iscsi_initiator_from_host, ini)
+            for ini in iscsi_initiators]
+        funcs += [functools.partial(
+            self.client.remove_fc_initiator_from_host, ini)
+            for ini in fc_initiators]
+        _run_in_parallel(funcs)
 
     def _get_ini_tgt_map(self, connector, host_id):
         ini_tgt_map = {}
@@ -1537,20 +1654,34 @@ class ClearLunMappingTask(task.Task):
                      {'lg': lungroup_id, 'count': obj_count})
             return {}
 
+        _drop_mapping_topology(self.client, connector)
+
         ini_tgt_map = {}
         if self.fc_san and host_id:
             ini_tgt_map = self._get_ini_tgt_map(connector, host_id)
 
+        # The groups are detached from the mapping view independently, and
+        # the initiators can leave the host meanwhile.
+        funcs = []
         if mappingview_id and portgroup_id:
-            self._delete_portgroup(mappingview_id, portgroup_id)
+            funcs.append(functools.partial(
+                self._delete_portgroup, mappingview_id, portgroup_id))
         if mappingview_id and lungroup_id:
-            self._delete_lungroup(mappingview_id, lungroup_id)
+            funcs.append(functools.partial(
+                self._delete_lungroup, mappingview_id, lungroup_id))
         if mappingview_id and hostgroup_id:
-            self._delete_hostgroup(mappingview_id, hostgroup_id, host_id)
+            funcs.append(functools.partial(
+                self._delete_hostgroup, mappingview_id, hostgroup_id,
+                host_id))
+        if host_id:
+            funcs.append(functools.partial(
+                self._remove_host_initiators, host_id))
+        _run_in_parallel(funcs)
+
         if mappingview_id:
             self.client.delete_mapping_view(mappingview_id)
         if host_id:
-            self._delete_host(host_id)
+            self.client.delete_host(host_id)
 
         return ini_tgt_map
 
@@ -1736,6 +1867,24 @@ class GetFCConnectionTask(task.Task):
         return ini_tgt_map, tgt_port_wwns
 
 
+class CheckFCConnectionTask(GetFCConnectionTask):
+    """Get the FC connection of a host already mapped.
+
+    A zoned host keeps using the ports of its portgroup. Newly selected
+    ports mean the portgroup is gone, so the host must be mapped again.
+    """
+
+    def execute(self, connector, host_id):
+        ini_tgt_map, tgt_port_wwns = super(
+            CheckFCConnectionTask, self).execute(connector, host_id)
+        if self.fc_san and ini_tgt_map:
+            msg = _('Portgroup of host %s is not found.') % host_id
+            LOG.error(msg)
+            raise exception.VolumeBackendAPIException(data=msg)
+
+        return ini_tgt_map, tgt_port_wwns
+
+
 class AddFCInitiatorTask(task.Task):
     def __init__(self, client, fc_info, *args, **kwargs):
         super(AddFCInitiatorTask, self).__init__(*args, **kwargs)
@@ -1812,22 +1961,20 @@ class GetFCPropertiesTask(task.Task):
 
     def execute(self, ini_tgt_map, tgt_port_wwns, hostlun_id, mappingview_id,
                 aval_host_lun_ids, lun_id, lun_info):
-        hostlun_id = int(hostlun_id)
-        mapping_info = {
-            'hostlun_id': hostlun_id,
-            'mappingview_id': mappingview_id,
-            'aval_host_lun_ids': aval_host_lun_ids,
-            'target_discovered': True,
-            'target_wwn': tgt_port_wwns,
-            'target_lun': hostlun_id,
-            'initiator_target_map': ini_tgt_map,
-            'lun_id': lun_id,
-        }
+        return _get_fc_mapping_info(
+            ini_tgt_map, tgt_port_wwns, hostlun_id, mappingview_id,
+            aval_host_lun_ids, lun_id, lun_info)
+
 
-        if lun_info.get('ALLOCTYPE') == constants.THIN_LUNTYPE:
-            mapping_info['discard'] = True
+class GetBatchFCPropertiesTask(task.Task):
+    default_provides = 'mapping_infos'
 
-        return mapping_info
+    def execute(self, ini_tgt_map, tgt_port_wwns, hostlun_ids,
+                mappingview_id, aval_host_lun_ids, lun_ids, lun_infos):
+        return [_get_fc_mapping_info(
+            ini_tgt_map, tgt_port_wwns, hostlun_ids[lun_id], mappingview_id,
+            aval_host_lun_ids, lun_id, lun_info)
+            for lun_id, lun_info in zip(lun_ids, lun_infos)]
 
 
 class ClassifyVolumeTask(task.Task):
@@ -1893,6 +2040,175 @@ class FailbackVolumeTask(task.Task):
         return volumes_update
 
 
+def _get_host_lun_id(client, lun_id, lun_type, host_id, mappingview_id):
+    if lun_type == constants.LUN_TYPE:
+        hostlun_id = client.get_lun_host_lun_id(host_id, lun_id)
+    else:
+        hostlun_id = client.get_snapshot_host_lun_id(host_id, lun_id)
+
+    if hostlun_id is None:
+        msg = _('Cannot get host lun id of %(lun)s in host %(host)s.') % {
+            'lun': lun_id, 'host': host_id}
+        LOG.error(msg)
+        raise exception.VolumeBackendAPIException(data=msg)
+
+    mappingview_info = client.get_mappingview_by_id(mappingview_id)
+    aval_host_lun_ids = json.loads(
+        mappingview_info['AVAILABLEHOSTLUNIDLIST'])
+    return hostlun_id, aval_host_lun_ids
+
+
+def _run_in_parallel(funcs):
+    """Run the independent funcs concurrently.
+
+    The first error is raised after all of them finish.
+    """
+    futures = huawei_utils.execute_in_parallel(lambda func: func(),
+                                               list(funcs))
+    for future in futures:
+        future.result()
+
+
+def _create_mapping_view(client, host_id, hostgroup_id, lungroup_id,
+                         portgroup_id):
+    mappingview_name = constants.MAPPING_VIEW_PREFIX + host_id
+    mappingview_id = client.create_mappingview(mappingview_name)
+    client.associate_hostgroup_to_mappingview(mappingview_id, hostgroup_id)
+    client.associate_lungroup_to_mappingview(mappingview_id, lungroup_id)
+    if portgroup_id:
+        client.associate_portgroup_to_mappingview(
+            mappingview_id, portgroup_id)
+    return mappingview_id
+
+
+def _get_host_lun_ids(client, lun_ids, host_id, mappingview_id):
+    host_lun_ids = client.get_host_lun_ids(host_id)
+    missing = [lun_id for lun_id in lun_ids if lun_id not in host_lun_ids]
+    if missing:
+        msg = _('Cannot get host lun id of %(luns)s in host %(host)s.') % {
+            'luns': missing, 'host': host_id}
+        LOG.error(msg)
+        raise exception.VolumeBackendAPIException(data=msg)
+
+    mappingview_info = client.get_mappingview_by_id(mappingview_id)
+    aval_host_lun_ids = json.loads(
+        mappingview_info['AVAILABLEHOSTLUNIDLIST'])
+    return host_lun_ids, aval_host_lun_ids
+
+
+def _get_iscsi_mapping_info(connector, hostlun_id, target_iqns, target_ips,
+                            chap_info, mappingview_id, aval_host_lun_ids,
+                            lun_id, lun_info):
+    hostlun_id = int(hostlun_id)
+    mapping_info = {
+        'target_discovered': False,
+        'hostlun_id': hostlun_id,
+        'mappingview_id': mappingview_id,
+        'aval_host_lun_ids': aval_host_lun_ids,
+        'lun_id': lun_id,
+    }
+
+    if connector.get('multipath'):
+        mapping_info.update({
+            'target_iqns': target_iqns,
+            'target_portals': ['%s:3260' % ip for ip in target_ips],
+            'target_luns': [hostlun_id] * len(target_ips),
+        })
+    else:
+        mapping_info.update({
+            'target_iqn': target_iqns[0],
+            'target_portal': '%s:3260' % target_ips[0],
+            'target_lun': hostlun_id,
+        })
+
+    if chap_info:
+        mapping_info['auth_method'] = 'CHAP'
+        mapping_info['auth_username'] = chap_info['CHAPNAME']
+        mapping_info['auth_password'] = chap_info['CHAPPASSWORD']
+
+    if lun_info.get('ALLOCTYPE') == constants.THIN_LUNTYPE:
+        mapping_info['discard'] = True
+
+    return mapping_info
+
+
+def _get_fc_mapping_info(ini_tgt_map, tgt_port_wwns, hostlun_id,
+                         mappingview_id, aval_host_lun_ids, lun_id, lun_info):
+    hostlun_id = int(hostlun_id)
+    mapping_info = {
+        'hostlun_id': hostlun_id,
+        'mappingview_id': mappingview_id,
+        'aval_host_lun_ids': aval_host_lun_ids,
+        'target_discovered': True,
+        'target_wwn': tgt_port_wwns,
+        'target_lun': hostlun_id,
+        'initiator_target_map': ini_tgt_map,
+        'lun_id': lun_id,
+    }
+
+    if lun_info.get('ALLOCTYPE') == constants.THIN_LUNTYPE:
+        mapping_info['discard'] = True
+
+    return mapping_info
+
+
+def _get_lun_check_task(client, lun_type):
+    if lun_type == constants.LUN_TYPE:
+        return CheckLunExistTask(client, rebind={'volume': 'lun'})
+
+    return CheckSnapshotExistTask(
+        client, provides=('snapshot_info', 'lun_id'),
+        rebind={'snapshot': 'lun'})
+
+
+def _get_topology_key(connector, protocol):
+    if protocol == 'iSCSI':
+        return connector['host'], protocol, connector['initiator']
+    wwns = tuple(sorted(wwn.lower() for wwn in connector['wwpns']))
+    return connector['host'], protocol, wwns
+
+
+def _drop_mapping_topology(client, connector):
+    for key in list(client.mapping_topology):
+        if key[0] == connector['host']:
+            client.mapping_topology.pop(key, None)
+
+
+def _run_mapping_flow(client, full_flow, fast_flow, store_spec, topology_key,
+                      topology_names, config_info,
+                      result_name='mapping_info'):
+    """Map the lun by the cached mapping topology of the host if any.
+
+    Once a host has been mapped, only its initiators are added to it again
+    and the lun is added to its lungroup. Any failure of the fast path means the cached topology is
+    stale, so it's dropped and the full mapping flow runs instead.
+    """
+    topology = client.mapping_topology.get(topology_key)
+    if topology and topology['config_info'] == config_info:
+        # The mapping info returned may be merged with the remote one in
+        # place, so never let it share objects with the cache.
+        store = dict(store_spec)
+        store.update(copy.deepcopy(topology['objects']))
+        try:
+            engine = taskflow.engines.load(fast_flow, store=store)
+            engine.run()
+            return engine.storage.fetch(result_name)
+        except Exception as err:
+            LOG.warning('Map by cached topology %(topology)s error: %(err)s, '
+                        'try the full mapping flow.',
+                        {'topology': topology['objects'], 'err': err})
+
+    client.mapping_topology.pop(topology_key, None)
+    engine = taskflow.engines.load(full_flow, store=store_spec)
+    engine.run()
+
+    objects = dict((name, copy.deepcopy(engine.storage.fetch(name)))
+                   for name in topology_names)
+    client.mapping_topology[topology_key] = {'config_info': config_info,
+                                             'objects': objects}
+    return engine.storage.fetch(result_name)
+
+
 def create_volume(volume, local_cli, hypermetro_rmt_cli, replication_rmt_cli,
                   configuration, feature_support):
     store_spec = {'volume': volume}
@@ -2250,16 +2566,8 @@ def initialize_iscsi_connection(lun, lun_type, connector, client,
                   'lun': lun,
                   'lun_type': lun_type}
     work_flow = linear_flow.Flow('initialize_iscsi_connection')
-
-    if lun_type == constants.LUN_TYPE:
-        work_flow.add(CheckLunExistTask(client, rebind={'volume': 'lun'}))
-    else:
-        work_flow.add(
-            CheckSnapshotExistTask(
-                client, provides=('snapshot_info', 'lun_id'),
-                rebind={'snapshot': 'lun'}))
-
     work_flow.add(
+        _get_lun_check_task(client, lun_type),
         CreateHostTask(client),
         GetISCSIConnectionTask(client, configuration.iscsi_info),
         AddISCSIInitiatorTask(client, configuration.iscsi_info),
@@ -2269,31 +2577,89 @@ def initialize_iscsi_connection(lun, lun_type, connector, client,
         GetISCSIPropertiesTask(),
     )
 
-    engine = taskflow.engines.load(work_flow, store=store_spec)
-    engine.run()
-    return engine.storage.fetch('mapping_info')
+    fast_flow = linear_flow.Flow('initialize_iscsi_connection_fast')
+    fast_flow.add(
+        _get_lun_check_task(client, lun_type),
+        GetISCSIConnectionTask(client, configuration.iscsi_info),
+        AddISCSIInitiatorTask(client, configuration.iscsi_info),
+        AddLunToLunGroupTask(client),
+        GetHostLunIDTask(client),
+        GetISCSIPropertiesTask(),
+    )
+
+    config_info = huawei_utils.find_config_info(configuration.iscsi_info,
+                                                connector=connector)
+    return _run_mapping_flow(
+        client, work_flow, fast_flow, store_spec,
+        _get_topology_key(connector, 'iSCSI'), ISCSI_TOPOLOGY, config_info)
+
+
+def initialize_iscsi_connections(volumes, connector, client, configuration):
+    store_spec = {'connector': connector,
+                  'volumes': volumes,
+                  'lun_type': constants.LUN_TYPE}
+    work_flow = linear_flow.Flow('initialize_iscsi_connections')
+    work_flow.add(
+        CheckLunsExistTask(client),
+        CreateHostTask(client),
+        GetISCSIConnectionTask(client, configuration.iscsi_info),
+        AddISCSIInitiatorTask(client, configuration.iscsi_info),
+        CreateHostGroupTask(client),
+        CreateBatchLunGroupTask(client),
+        CreateBatchMappingViewTask(client),
+        GetBatchISCSIPropertiesTask(),
+    )
+
+    fast_flow = linear_flow.Flow('initialize_iscsi_connections_fast')
+    fast_flow.add(
+        CheckLunsExistTask(client),
+        GetISCSIConnectionTask(client, configuration.iscsi_info),
+        AddISCSIInitiatorTask(client, configuration.iscsi_info),
+        AddLunsToLunGroupTask(client),
+        GetHostLunIDsTask(client),
+        GetBatchISCSIPropertiesTask(),
+    )
+
+    config_info = huawei_utils.find_config_info(configuration.iscsi_info,
+                                                connector=connector)
+    return _run_mapping_flow(
+        client, work_flow, fast_flow, store_spec,
+        _get_topology_key(connector, 'iSCSI'), ISCSI_TOPOLOGY, config_info,
+        result_name='mapping_infos')
 
 
 def initialize_remote_iscsi_connection(hypermetro_id, connector,
                                        client, configuration):
     store_spec = {'connector': connector,
                   'lun_type': constants.LUN_TYPE}
+    iscsi_info = configuration.hypermetro['iscsi_info']
     work_flow = linear_flow.Flow('initialize_remote_iscsi_connection')
-
     work_flow.add(
         GetHyperMetroRemoteLunTask(client, hypermetro_id),
         CreateHostTask(client),
-        GetISCSIConnectionTask(client, configuration.hypermetro['iscsi_info']),
-        AddISCSIInitiatorTask(client, configuration.hypermetro['iscsi_info']),
+        GetISCSIConnectionTask(client, iscsi_info),
+        AddISCSIInitiatorTask(client, iscsi_info),
         CreateHostGroupTask(client),
         CreateLunGroupTask(client),
         CreateMappingViewTask(client),
         GetISCSIPropertiesTask(client),
     )
 
-    engine = taskflow.engines.load(work_flow, store=store_spec)
-    engine.run()
-    return engine.storage.fetch('mapping_info')
+    fast_flow = linear_flow.Flow('initialize_remote_iscsi_connection_fast')
+    fast_flow.add(
+        GetHyperMetroRemoteLunTask(client, hypermetro_id),
+        GetISCSIConnectionTask(client, iscsi_info),
+        AddISCSIInitiatorTask(client, iscsi_info),
+        AddLunToLunGroupTask(client),
+        GetHostLunIDTask(client),
+        GetISCSIPropertiesTask(client),
+    )
+
+    config_info = huawei_utils.find_config_info(iscsi_info,
+                                                connector=connector)
+    return _run_mapping_flow(
+        client, work_flow, fast_flow, store_spec,
+        _get_topology_key(connector, 'iSCSI'), ISCSI_TOPOLOGY, config_info)
 
 
 def terminate_iscsi_connection(lun, lun_type, connector, client):
@@ -2335,22 +2701,19 @@ def terminate_remote_iscsi_connection(hypermetro_id, connector, client):
     engine.run()
 
 
+def _get_fc_config_info(fc_info, connector):
+    return [huawei_utils.find_config_info(fc_info, initiator=wwn.lower())
+            for wwn in sorted(connector['wwpns'])]
+
+
 def initialize_fc_connection(lun, lun_type, connector, fc_san, client,
                              configuration):
     store_spec = {'connector': connector,
                   'lun': lun,
                   'lun_type': lun_type}
     work_flow = linear_flow.Flow('initialize_fc_connection')
-
-    if lun_type == constants.LUN_TYPE:
-        work_flow.add(CheckLunExistTask(client, rebind={'volume': 'lun'}))
-    else:
-        work_flow.add(
-            CheckSnapshotExistTask(
-                client, provides=('snapshot_info', 'lun_id'),
-                rebind={'snapshot': 'lun'}))
-
     work_flow.add(
+        _get_lun_check_task(client, lun_type),
         CreateHostTask(client),
         GetFCConnectionTask(client, fc_san),
         AddFCInitiatorTask(client, configuration.fc_info),
@@ -2361,22 +2724,68 @@ def initialize_fc_connection(lun, lun_type, connector, fc_san, client,
         GetFCPropertiesTask(),
     )
 
-    engine = taskflow.engines.load(work_flow, store=store_spec)
-    engine.run()
-    return engine.storage.fetch('mapping_info')
+    fast_flow = linear_flow.Flow('initialize_fc_connection_fast')
+    fast_flow.add(
+        _get_lun_check_task(client, lun_type),
+        CheckFCConnectionTask(client, fc_san),
+        AddFCInitiatorTask(client, configuration.fc_info),
+        AddLunToLunGroupTask(client),
+        GetHostLunIDTask(client),
+        GetFCPropertiesTask(),
+    )
+
+    config_info = _get_fc_config_info(configuration.fc_info, connector)
+    return _run_mapping_flow(
+        client, work_flow, fast_flow, store_spec,
+        _get_topology_key(connector, 'FC'), FC_TOPOLOGY, config_info)
+
+
+def initialize_fc_connections(volumes, connector, fc_san, client,
+                              configuration):
+    store_spec = {'connector': connector,
+                  'volumes': volumes,
+                  'lun_type': constants.LUN_TYPE}
+    work_flow = linear_flow.Flow('initialize_fc_connections')
+    work_flow.add(
+        CheckLunsExistTask(client),
+        CreateHostTask(client),
+        GetFCConnectionTask(client, fc_san),
+        AddFCInitiatorTask(client, configuration.fc_info),
+        CreateHostGroupTask(client),
+        CreateBatchLunGroupTask(client),
+        CreateFCPortGroupTask(client, fc_san),
+        CreateBatchMappingViewTask(client),
+        GetBatchFCPropertiesTask(),
+    )
+
+    fast_flow = linear_flow.Flow('initialize_fc_connections_fast')
+    fast_flow.add(
+        CheckLunsExistTask(client),
+        CheckFCConnectionTask(client, fc_san),
+        AddFCInitiatorTask(client, configuration.fc_info),
+        AddLunsToLunGroupTask(client),
+        GetHostLunIDsTask(client),
+        GetBatchFCPropertiesTask(),
+    )
+
+    config_info = _get_fc_config_info(configuration.fc_info, connector)
+    return _run_mapping_flow(
+        client, work_flow, fast_flow, store_spec,
+        _get_topology_key(connector, 'FC'), FC_TOPOLOGY, config_info,
+        result_name='mapping_infos')
 
 
 def initialize_remote_fc_connection(hypermetro_id, connector, fc_san, client,
                                     configuration):
     store_spec = {'connector': connector,
                   'lun_type': constants.LUN_TYPE}
+    fc_info = configuration.hypermetro['fc_info']
     work_flow = linear_flow.Flow('initialize_remote_fc_connection')
-
     work_flow.add(
         GetHyperMetroRemoteLunTask(client, hypermetro_id),
         CreateHostTask(client),
         GetFCConnectionTask(client, fc_san),
-        AddFCInitiatorTask(client, configuration.hypermetro['fc_info']),
+        AddFCInitiatorTask(client, fc_info),
         CreateHostGroupTask(client),
         CreateLunGroupTask(client),
         CreateFCPortGroupTask(client, fc_san),
@@ -2384,9 +2793,20 @@ def initialize_remote_fc_connection(hypermetro_id, connector, fc_san, client,
         GetFCPropertiesTask(),
     )
 
-    engine = taskflow.engines.load(work_flow, store=store_spec)
-    engine.run()
-    return engine.storage.fetch('mapping_info')
+    fast_flow = linear_flow.Flow('initialize_remote_fc_connection_fast')
+    fast_flow.add(
+        GetHyperMetroRemoteLunTask(client, hypermetro_id),
+        CheckFCConnectionTask(client, fc_san),
+        AddFCInitiatorTask(client, fc_info),
+        AddLunToLunGroupTask(client),
+        GetHostLunIDTask(client),
+        GetFCPropertiesTask(),
+    )
+
+    config_info = _get_fc_config_info(fc_info, connector)
+    return _run_mapping_flow(
+        client, work_flow, fast_flow, store_spec,
+        _get_topology_key(connector, 'FC'), FC_TOPOLOGY, config_info)
 
 
 def terminate_fc_connection(lun, lun_type, connector, fc_san, client):
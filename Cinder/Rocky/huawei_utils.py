@@ -13,11 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import futurist
 import hashlib
 import json
-import re
 import retrying
 import six
+import sys
+import threading
+import time
 
 from oslo_log import log as logging
 from oslo_utils import strutils
@@ -65,20 +69,193 @@ def old_encode_host_name(name):
     return name
 
 
-def wait_for_condition(func, interval, timeout):
+def wait_for_condition(func, interval, timeout, initial_interval=None):
+    """Wait until func returns True.
+
+    The check is retried with exponential backoff, starting from
+    initial_interval and doubling up to the ceiling of interval seconds,
+    so that fast operations are noticed soon without flooding the array
+    with queries for slow ones.
+    """
     def _retry_on_result(result):
         return not result
 
     def _retry_on_exception(result):
         return False
 
+    if not initial_interval:
+        initial_interval = constants.DEFAULT_WAIT_INITIAL_INTERVAL
+    initial_interval = min(initial_interval, interval)
+    # Retrying waits multiplier * 2 ** attempt milliseconds after each
+    # attempt, and attempt begins from 1.
     r = retrying.Retrying(retry_on_result=_retry_on_result,
                           retry_on_exception=_retry_on_exception,
-                          wait_fixed=interval * 1000,
+                          wait_exponential_multiplier=initial_interval * 500,
+                          wait_exponential_max=interval * 1000,
                           stop_max_delay=timeout * 1000)
     r.call(func)
 
 
+def execute_in_parallel(func, items,
+                        max_workers=constants.MAX_PARALLEL_WORKERS):
+    """Call func for each item concurrently and wait for all of them.
+
+    Returns the futures in the order of items.
+    """
+    if not items:
+        return []
+
+    with futurist.ThreadPoolExecutor(
+            max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(func, item) for item in items]
+
+    return futures
+
+
+class BatchCoalescer(object):
+    """Coalesce the requests of the same key arriving while one is running.
+
+    A request of an idle key is handled by single_func at once. A request
+    arriving while another of the same key is running is queued, the first
+    queued one waits for the window, then handles all the requests gathered
+    meanwhile by batch_func, which returns one result for each item in
+    order. A request handled alone, or whose batch failed, is handled by
+    single_func in its own thread.
+    """
+
+    def __init__(self, window=constants.ATTACH_BATCH_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._running = collections.Counter()
+
+    def _release(self, key):
+        with self._lock:
+            self._running[key] -= 1
+            if not self._running[key]:
+                del self._running[key]
+
+    def _run_batch(self, batch, batch_func):
+        try:
+            results = batch_func([entry['item'] for entry in batch])
+        except Exception:
+            LOG.exception('Handle batch of %s requests error, handle them '
+                          'one by one.', len(batch))
+        else:
+            for entry, result in zip(batch, results):
+                entry['result'] = result
+                entry['done'] = True
+        finally:
+            for entry in batch:
+                entry['event'].set()
+
+    def submit(self, key, item, batch_func, single_func):
+        entry = {'item': item,
+                 'event': threading.Event(),
+                 'done': False,
+                 'result': None}
+        with self._lock:
+            idle = not self._running[key] and key not in self._pending
+            if idle:
+                leader = False
+            else:
+                batch = self._pending.setdefault(key, [])
+                batch.append(entry)
+                leader = len(batch) == 1
+            self._running[key] += 1
+
+        try:
+            if idle:
+                return single_func(item)
+
+            if leader:
+                time.sleep(self.window)
+                with self._lock:
+                    batch = self._pending.pop(key)
+                if len(batch) > 1:
+                    self._run_batch(batch, batch_func)
+            else:
+                entry['event'].wait()
+
+            if entry['done']:
+                return entry['result']
+            return single_func(item)
+        finally:
+            self._release(key)
+
+
+class _PageFetcher(threading.Thread):
+    """Query one page of a ranged list query in a daemon thread.
+
+    result() waits for the query, then returns its objects or re-raises
+    its exception in the caller's thread.
+    """
+
+    def __init__(self, query_page, begin, end):
+        super(_PageFetcher, self).__init__()
+        self.daemon = True
+        self._query_page = query_page
+        self._begin = begin
+        self._end = end
+        self._objs = None
+        self._exc_info = None
+
+    def run(self):
+        try:
+            self._objs = self._query_page(self._begin, self._end)
+        except Exception:
+            self._exc_info = sys.exc_info()
+
+    def result(self):
+        self.join()
+        if self._exc_info:
+            six.reraise(*self._exc_info)
+        return self._objs
+
+
+def iter_pages(query_page, page_size=constants.QUERY_PAGE_SIZE,
+               prefetch=False):
+    """Yield the objects of a ranged list query page by page.
+
+    query_page(start, end) returns the objects in range [start, end). The
+    next page is queried only when the current one is used up, and the
+    iteration ends at the first page shorter than page_size. With prefetch,
+    a _PageFetcher queries the next page while the current one is yielded,
+    which costs one unused page query if the caller stops early.
+    """
+    start = 0
+    fetcher = None
+    while True:
+        if fetcher:
+            objs = fetcher.result()
+        else:
+            objs = query_page(start, start + page_size)
+
+        fetcher = None
+        if prefetch and len(objs) >= page_size:
+            fetcher = _PageFetcher(query_page, start + page_size,
+                                   start + 2 * page_size)
+            fetcher.start()
+
+        for obj in objs:
+            yield obj
+
+        if len(objs) < page_size:
+            return
+        start += page_size
+
+
+def find_in_pages(query_page, predicate, **kwargs):
+    """Return the first object of a ranged list query matching predicate.
+
+    The pages after the matched one are not queried. Returns None if no
+    object matches. kwargs are passed to iter_pages.
+    """
+    for obj in iter_pages(query_page, **kwargs):
+        if predicate(obj):
+            return obj
+
+
 def _get_volume_type(volume):
     if volume.volume_type:
         return volume.volume_type
@@ -296,8 +473,7 @@ def _verify_smartpartition_opts(opts):
 
 
 def wait_lun_online(client, lun_id, wait_interval=None, wait_timeout=None):
-    def _lun_online():
-        result = client.get_lun_info_by_id(lun_id)
+    def _lun_online(result):
         if result['HEALTHSTATUS'] != constants.STATUS_HEALTH:
             err_msg = _('LUN %s is abnormal.') % lun_id
             LOG.error(err_msg)
@@ -313,7 +489,8 @@ def wait_lun_online(client, lun_id, wait_interval=None, wait_timeout=None):
     if not wait_timeout:
         wait_timeout = wait_interval * 10
 
-    wait_for_condition(_lun_online, wait_interval, wait_timeout)
+    client.status_poller.wait('lun', lun_id, _lun_online, wait_timeout,
+                              interval=wait_interval)
 
 
 def is_not_exist_exc(exc):
@@ -520,25 +697,19 @@ def find_config_info(config_info, connector=None, initiator=None):
     else:
         ini = config_info['initiators'].get(initiator)
 
-    find_info = None
-    tmp_find_info = None
-    if not ini:
-        for item in config_info['initiators']:
-            ini_info = config_info['initiators'][item]
-            if ini_info.get('HostName'):
-                if ini_info.get('HostName') == '*':
-                    tmp_find_info = ini_info
-                elif re.search(ini_info.get('HostName'), connector['host']):
-                    find_info = ini_info
-                    break
-
-    if find_info is None and tmp_find_info:
-        find_info = tmp_find_info
-
     if ini:
-        config = ini
-    elif find_info:
-        config = find_info
-    else:
-        config = {}
-    return config
+        return ini
+    if not connector:
+        return {}
+
+    host = connector['host']
+    cache = config_info['hostname_cache']
+    if host not in cache:
+        for pattern, ini_info in config_info['hostname_patterns']:
+            if pattern.search(host):
+                cache[host] = ini_info
+                break
+        else:
+            cache[host] = config_info['default_hostname_info']
+
+    return cache[host] or {}
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
 import functools
 import inspect
 import json
@@ -25,9 +26,11 @@ import time
 from cinder import exception
 from cinder.i18n import _
 from cinder.volume.drivers.huawei import constants
+from cinder.volume.drivers.huawei import huawei_utils
 
 from oslo_concurrency import lockutils
 from oslo_log import log as logging
+from oslo_utils import excutils
 from requests.adapters import HTTPAdapter
 
 
@@ -38,8 +41,81 @@ def _error_code(result):
     return result['error']['code']
 
 
-# To limit the requests concurrently sent to array
-_semaphore = threading.Semaphore(20)
+class AdaptiveLimiter(object):
+    """Limit the requests concurrently sent to one array.
+
+    The limit is adjusted by AIMD: it grows by one after a full limit of
+    healthy requests, and is cut by CONCURRENCY_BACKOFF_RATIO when a request
+    fails or its latency exceeds CONCURRENCY_LATENCY_TOLERANCE times of the
+    smoothed baseline latency.
+    """
+
+    def __init__(self, initial=constants.CONCURRENCY_INITIAL_LIMIT,
+                 min_limit=constants.CONCURRENCY_MIN_LIMIT,
+                 max_limit=constants.CONCURRENCY_MAX_LIMIT):
+        self._cond = threading.Condition()
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._inflight = 0
+        self._baseline = None
+        self._last_backoff = 0
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def inflight(self):
+        return self._inflight
+
+    def set_max_limit(self, max_limit):
+        with self._cond:
+            self._max_limit = max(self._min_limit, max_limit)
+            self._limit = min(self._limit, float(self._max_limit))
+            self._cond.notify_all()
+
+    def acquire(self):
+        with self._cond:
+            while self._inflight >= int(self._limit):
+                self._cond.wait()
+            self._inflight += 1
+
+    def release(self, latency, failed=False):
+        with self._cond:
+            self._inflight -= 1
+            self._update_limit(latency, failed)
+            self._cond.notify_all()
+
+    def _update_limit(self, latency, failed):
+        if self._baseline is None:
+            self._baseline = latency
+
+        congested = failed or (
+            latency > constants.CONCURRENCY_LATENCY_FLOOR and
+            latency > self._baseline * constants.CONCURRENCY_LATENCY_TOLERANCE)
+
+        if not congested:
+            self._baseline += (latency - self._baseline
+                               ) * constants.CONCURRENCY_LATENCY_SMOOTHING
+            self._limit = min(self._limit + 1.0 / self._limit,
+                              self._max_limit)
+            return
+
+        # Only back off once per round trip, requests sent before the last
+        # backoff would report the same congestion again.
+        now = time.time()
+        if now - self._last_backoff < latency:
+            return
+
+        self._last_backoff = now
+        old_limit = self.limit
+        self._limit = max(self._limit * constants.CONCURRENCY_BACKOFF_RATIO,
+                          self._min_limit)
+        LOG.debug('Reduce concurrency limit from %(old)s to %(new)s, '
+                  'latency: %(latency).3fs, failed: %(failed)s.',
+                  {'old': old_limit, 'new': self.limit,
+                   'latency': latency, 'failed': failed})
 
 
 def obj_operation_wrapper(func):
@@ -49,25 +125,350 @@ def obj_operation_wrapper(func):
         if url_format:
             url += url_format % kwargs
 
-        _semaphore.acquire()
+        limiter = self.client.limiter
+        limiter.acquire()
+        start = time.time()
+        failed = True
 
         try:
             result = func(self, url, **kwargs)
+            failed = False
         except requests.HTTPError as exc:
             return {"error": {"code": exc.response.status_code,
                               "description": six.text_type(exc)}}
         finally:
-            _semaphore.release()
+            limiter.release(time.time() - start, failed)
 
         return result
 
     return wrapped
 
 
+class QueryCache(object):
+    """Cache the results of queries which rarely change on array.
+
+    Entries expire after ttl seconds, and can be dropped explicitly by
+    invalidate. Concurrent misses of the same key are loaded only once,
+    empty results are never cached. Callers get their own copy of a
+    result, so they may modify it freely.
+    """
+
+    def __init__(self, ttl=constants.QUERY_CACHE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._loading_locks = {}
+
+    def _evict(self, key):
+        self._entries.pop(key, None)
+        self._loading_locks.pop(key, None)
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return False, None
+            if entry[1] <= time.time():
+                self._evict(key)
+                return False, None
+        return True, copy.deepcopy(entry[0])
+
+    def get(self, key, loader):
+        found, value = self._lookup(key)
+        if found:
+            return value
+
+        with self._lock:
+            loading_lock = self._loading_locks.setdefault(
+                key, threading.Lock())
+
+        with loading_lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+
+            value = loader()
+            with self._lock:
+                if value:
+                    self._entries[key] = (copy.deepcopy(value),
+                                          time.time() + self._ttl)
+                elif self._loading_locks.get(key) is loading_lock:
+                    self._loading_locks.pop(key)
+
+        return value
+
+    def invalidate(self, kind=None):
+        with self._lock:
+            for key in list(self._entries):
+                if kind is None or key[0] == kind:
+                    self._evict(key)
+
+
+class HostLunIDCache(object):
+    """Cache the host lun IDs of the objects mapped to hosts.
+
+    Entries expire after ttl seconds. The entries of an object are dropped
+    when it's newly associated to or removed from a lungroup, or its host
+    lun ID is changed, since its host lun ID may change then.
+    """
+
+    def __init__(self, ttl=constants.QUERY_CACHE_TTL):
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # (object type, object ID): {host ID: (host lun ID, expire time)}
+        self._entries = {}
+
+    def get(self, obj_type, host_id, obj_id):
+        with self._lock:
+            entry = self._entries.get((obj_type, obj_id), {}).get(host_id)
+        if entry and entry[1] > time.time():
+            return entry[0]
+
+    def update(self, obj_type, host_id, host_lun_ids):
+        expire = time.time() + self._ttl
+        with self._lock:
+            for obj_id, hostlun_id in six.iteritems(host_lun_ids):
+                self._entries.setdefault((obj_type, obj_id), {})[host_id] = (
+                    hostlun_id, expire)
+
+    def remove(self, obj_type, obj_id):
+        with self._lock:
+            self._entries.pop((obj_type, obj_id), None)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class StatusPoller(object):
+    """Poll the status of in-flight objects with shared list queries.
+
+    Every thread waiting for an object registers it here, and a background
+    thread refreshes all registered objects each round. LUNs and snapshots
+    are listed by a running status filter, which only returns the objects
+    still initializing. LUN copies can only be listed in full, so they are
+    listed only when the pages of the list are fewer than the objects in
+    flight. Replication pairs and groups are always queried by ID, as their
+    waits come in bursts on failover when the remote array is busiest. The
+    objects not listed are queried concurrently. The round interval doubles
+    up to DEFAULT_WAIT_INTERVAL, or the smallest interval asked by a
+    waiter. A newly registered object is polled soon and the backoff
+    restarts from the floor of its type, and rounds are never closer than
+    the smallest floor of the types in flight.
+    """
+
+    # Object type: (list method or None to query by ID only, list method
+    # args, count method of the full list or None for a filtered list, get
+    # method by ID)
+    _QUERIES = {
+        'lun': ('get_luns_by_running_status', (constants.LUN_INITIALIZING,),
+                None, 'get_lun_info_by_id'),
+        'snapshot': ('get_snapshots_by_running_status',
+                     (constants.SNAPSHOT_INITIALIZING,), None,
+                     'get_snapshot_info_by_id'),
+        'luncopy': ('get_all_luncopies', (), 'get_luncopy_count',
+                    'get_luncopy_info'),
+        'replication_pair': (None, (), None, 'get_replication_pair_by_id'),
+        'replication_group': (None, (), None, 'get_replication_group_by_id'),
+    }
+
+    # LUNs and snapshots are usually ready in a moment, so keep polling
+    # them from DEFAULT_WAIT_INITIAL_INTERVAL like wait_for_condition.
+    _MIN_INTERVALS = {
+        'lun': constants.DEFAULT_WAIT_INITIAL_INTERVAL,
+        'snapshot': constants.DEFAULT_WAIT_INITIAL_INTERVAL,
+    }
+
+    def __init__(self, client):
+        self.client = client
+        self._cond = threading.Condition()
+        self._wakeup = threading.Event()
+        self._waiters = {}
+        self._max_intervals = {}
+        self._results = {}
+        self._round = 0
+        self._interval = constants.STATUS_POLL_MIN_INTERVAL
+        self._last_poll = 0
+        self._thread = None
+
+    def wait(self, obj_type, obj_id, check, timeout, interval=None):
+        """Wait until check returns True for the info of an object.
+
+        Exceptions raised by check or by querying the object are raised
+        to the caller. Returns the last info of the object. If interval
+        is given, the object is polled at least that often.
+        """
+        key = (obj_type, obj_id)
+        deadline = time.time() + timeout
+        waiter = object()
+
+        with self._cond:
+            self._waiters[key] = self._waiters.get(key, 0) + 1
+            if interval:
+                self._max_intervals[waiter] = interval
+            self._interval = min(self._interval,
+                                 self._min_interval(obj_type))
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        self._wakeup.set()
+
+        try:
+            while True:
+                info = self._next_result(key, deadline)
+                if isinstance(info, Exception):
+                    raise info
+                if check(info):
+                    return info
+        finally:
+            with self._cond:
+                self._max_intervals.pop(waiter, None)
+                self._waiters[key] -= 1
+                if not self._waiters[key]:
+                    self._waiters.pop(key)
+                    self._results.pop(key, None)
+
+    def _min_interval(self, obj_type):
+        return self._MIN_INTERVALS.get(obj_type,
+                                       constants.STATUS_POLL_MIN_INTERVAL)
+
+    def _next_result(self, key, deadline):
+        with self._cond:
+            current_round = self._round
+            # The round running while the object registered may not cover
+            # it, so wait until a round which has its result.
+            while self._round == current_round or key not in self._results:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    msg = _('Wait for %(type)s %(id)s timeout.'
+                            ) % {'type': key[0], 'id': key[1]}
+                    LOG.error(msg)
+                    raise exception.VolumeBackendAPIException(data=msg)
+                self._cond.wait(remaining)
+
+            return self._results[key]
+
+    def _run(self):
+        try:
+            self._poll_loop()
+        except Exception as err:
+            LOG.exception('Status poller stopped unexpectedly.')
+            # Wake up the waiters with the error instead of letting them
+            # wait until their timeout.
+            with self._cond:
+                for key in self._waiters:
+                    self._results[key] = err
+                self._round += 1
+                self._thread = None
+                self._cond.notify_all()
+        finally:
+            with self._cond:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+
+    def _poll_loop(self):
+        next_poll = time.time() + constants.DEFAULT_WAIT_INITIAL_INTERVAL
+        while True:
+            self._wakeup.wait(max(next_poll - time.time(), 0))
+            if self._wakeup.is_set():
+                self._wakeup.clear()
+                with self._cond:
+                    min_interval = min(
+                        [constants.STATUS_POLL_MIN_INTERVAL] +
+                        [self._min_interval(obj_type)
+                         for obj_type, _obj_id in self._waiters])
+                next_poll = min(next_poll, max(
+                    time.time() + constants.DEFAULT_WAIT_INITIAL_INTERVAL,
+                    self._last_poll + min_interval))
+                if time.time() < next_poll:
+                    continue
+
+            with self._cond:
+                if not self._waiters:
+                    self._thread = None
+                    return
+                keys = list(self._waiters)
+
+            self._last_poll = time.time()
+            results = self._poll(keys)
+
+            with self._cond:
+                self._results.update(results)
+                self._round += 1
+                self._cond.notify_all()
+                max_interval = min([constants.DEFAULT_WAIT_INTERVAL] +
+                                   list(self._max_intervals.values()))
+                next_poll = time.time() + min(self._interval, max_interval)
+                self._interval = min(self._interval * 2, max_interval)
+
+    def _should_list(self, list_method, count_method, obj_num):
+        if not list_method or obj_num < 2:
+            return False
+        if not count_method:
+            return True
+
+        # Listing costs the count query and every page of the list, which
+        # grows with the array, so only do it when it beats the GETs.
+        count = getattr(self.client, count_method)()
+        pages = (count + constants.QUERY_PAGE_SIZE -
+                 1) // constants.QUERY_PAGE_SIZE
+        return pages + 1 < obj_num
+
+    def _poll(self, keys):
+        obj_ids = {}
+        for obj_type, obj_id in keys:
+            obj_ids.setdefault(obj_type, set()).add(obj_id)
+
+        results = {}
+        for obj_type, ids in obj_ids.items():
+            (list_method, list_args, count_method,
+             get_method) = self._QUERIES[obj_type]
+
+            listed = {}
+            try:
+                if self._should_list(list_method, count_method, len(ids)):
+                    objs = getattr(self.client, list_method)(*list_args)
+                    listed = dict((obj['ID'], obj) for obj in objs)
+            except Exception:
+                LOG.exception('List %s failed, query them one by one.',
+                              obj_type)
+                listed = {}
+
+            missing_ids = []
+            for obj_id in ids:
+                if obj_id in listed:
+                    results[(obj_type, obj_id)] = listed[obj_id]
+                else:
+                    missing_ids.append(obj_id)
+
+            futures = huawei_utils.execute_in_parallel(
+                getattr(self.client, get_method), missing_ids)
+            for obj_id, future in zip(missing_ids, futures):
+                results[(obj_type, obj_id)] = (future.exception() or
+                                               future.result())
+
+        return results
+
+
+def cached_query(kind):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapped(self, *args):
+            return self.cache.get((kind,) + args,
+                                  lambda: func(self, *args))
+        return wrapped
+    return decorator
+
+
 class CommonObject(object):
     def __init__(self, client):
         self.client = client
 
+    @property
+    def cache(self):
+        return self.client.cache
+
     @obj_operation_wrapper
     def post(self, url, **kwargs):
         return self.client.post(url, **kwargs)
@@ -93,6 +494,59 @@ def _assert_result(result, msg_format, *args):
         raise exception.VolumeBackendAPIException(data=msg)
 
 
+def _get_page_query(obj, url_format, msg_format, *args, **kwargs):
+    def _query_page(start, end):
+        result = obj.get(url_format + 'range=[%(start)s-%(end)s]',
+                         start=start, end=end, **kwargs)
+        _assert_result(result, msg_format, *args)
+        return result.get('data', [])
+
+    return _query_page
+
+
+def _get_count(obj, msg_format, *args):
+    result = obj.get('/count')
+    _assert_result(result, msg_format, *args)
+    return int(result['data']['COUNT'])
+
+
+def _get_all_pages(obj, url_format, msg_format, *args, **kwargs):
+    """Query all objects of a list url page by page."""
+    return list(huawei_utils.iter_pages(
+        _get_page_query(obj, url_format, msg_format, *args, **kwargs),
+        prefetch=True))
+
+
+def _parse_host_lun_ids(result):
+    host_lun_ids = {}
+    for item in result.get('data', []):
+        metadata = json.loads(item['ASSOCIATEMETADATA'])
+        host_lun_ids[item['ID']] = metadata['HostLUNID']
+    return host_lun_ids
+
+
+def _get_host_lun_id(obj, obj_type, host_id, obj_id):
+    """Get the host lun ID of an object mapped to a host.
+
+    The object is queried by an ID filter. Arrays not supporting the filter
+    return all objects mapped to the host, which fill the cache as well.
+    """
+    hostlun_id = obj.client.host_lun_ids.get(obj_type, host_id, obj_id)
+    if hostlun_id is not None:
+        return hostlun_id
+
+    url_format = "/associate?ASSOCIATEOBJTYPE=21&ASSOCIATEOBJID=%(id)s"
+    result = obj.get(url_format + "&filter=ID::%(obj_id)s",
+                     id=host_id, obj_id=obj_id)
+    if _error_code(result) != 0:
+        result = obj.get(url_format, id=host_id)
+    _assert_result(result, 'Get objects related to host %s error.', host_id)
+
+    host_lun_ids = _parse_host_lun_ids(result)
+    obj.client.host_lun_ids.update(obj_type, host_id, host_lun_ids)
+    return host_lun_ids.get(obj_id)
+
+
 class Lun(CommonObject):
     _obj_url = '/lun'
 
@@ -172,26 +626,35 @@ class Lun(CommonObject):
         _assert_result(result, 'Get lun info by id %s error.', lun_id)
         return result['data']
 
+    def get_luns_by_running_status(self, status):
+        return _get_all_pages(self, '?filter=RUNNINGSTATUS::%(status)s&',
+                              'Get luns by running status %s error.',
+                              status, status=status)
+
     def get_lun_host_lun_id(self, host_id, lun_id):
+        return _get_host_lun_id(self, constants.LUN_TYPE, host_id, lun_id)
+
+    def get_host_lun_ids(self, host_id):
         result = self.get(
             "/associate?ASSOCIATEOBJTYPE=21&ASSOCIATEOBJID=%(id)s", id=host_id)
         _assert_result(result, 'Get lun info related to host %s error.',
                        host_id)
 
-        for item in result.get('data', []):
-            if lun_id == item['ID']:
-                metadata = json.loads(item['ASSOCIATEMETADATA'])
-                return metadata['HostLUNID']
+        host_lun_ids = _parse_host_lun_ids(result)
+        self.client.host_lun_ids.update(
+            constants.LUN_TYPE, host_id, host_lun_ids)
+        return host_lun_ids
 
 
 class StoragePool(CommonObject):
     _obj_url = '/storagepool'
 
     def get_all_pools(self):
-        result = self.get()
+        result = self.get(log_filter=True)
         _assert_result(result, 'Query storage pools error.')
         return result.get('data', [])
 
+    @cached_query('pool_id')
     def get_pool_id(self, pool_name):
         result = self.get('?filter=NAME::%(name)s', name=pool_name)
         _assert_result(result, 'Query storage pool by name %s error.',
@@ -252,6 +715,11 @@ class Snapshot(CommonObject):
                        snapshot_id)
         return result['data']
 
+    def get_snapshots_by_running_status(self, status):
+        return _get_all_pages(self, '?filter=RUNNINGSTATUS::%(status)s&',
+                              'Get snapshots by running status %s error.',
+                              status, status=status)
+
     def update_snapshot(self, snapshot_id, data):
         result = self.put('/%(id)s', id=snapshot_id, data=data)
         _assert_result(result, 'Update snapshot %s error.', snapshot_id)
@@ -264,15 +732,8 @@ class Snapshot(CommonObject):
         return int(result['data']['COUNT'])
 
     def get_snapshot_host_lun_id(self, host_id, snap_id):
-        result = self.get(
-            "/associate?ASSOCIATEOBJTYPE=21&ASSOCIATEOBJID=%(id)s", id=host_id)
-        _assert_result(result, 'Get snapshot info related to host %s error.',
-                       host_id)
-
-        for item in result.get('data', []):
-            if snap_id == item['ID']:
-                metadata = json.loads(item['ASSOCIATEMETADATA'])
-                return metadata['HostLUNID']
+        return _get_host_lun_id(self, constants.SNAPSHOT_TYPE, host_id,
+                                snap_id)
 
 
 class LunCopy(CommonObject):
@@ -308,6 +769,12 @@ class LunCopy(CommonObject):
         _assert_result(result, 'Get LUNCOPY %s error.', luncopy_id)
         return result.get('data', {})
 
+    def get_all_luncopies(self):
+        return _get_all_pages(self, '?', 'Get all LUNCOPYs error.')
+
+    def get_luncopy_count(self):
+        return _get_count(self, 'Get LUNCOPY count error.')
+
     def delete_luncopy(self, luncopy_id):
         result = self.delete('/%(id)s', id=luncopy_id)
         if _error_code(result) == constants.LUNCOPY_NOT_EXIST:
@@ -458,12 +925,14 @@ class LunGroup(CommonObject):
             return
         _assert_result(result, 'Associate obj %s to lungroup %s error.',
                        obj_id, lungroup_id)
+        self.client.host_lun_ids.remove(obj_type, obj_id)
 
     def remove_lun_from_lungroup(self, lungroup_id, obj_id, obj_type):
         result = self.delete(
             "/associate?ID=%(lungroup_id)s&ASSOCIATEOBJTYPE=%(obj_type)s&"
             "ASSOCIATEOBJID=%(obj_id)s", lungroup_id=lungroup_id,
             obj_id=obj_id, obj_type=obj_type)
+        self.client.host_lun_ids.remove(obj_type, obj_id)
         if _error_code(result) == constants.OBJECT_NOT_EXIST:
             LOG.warning('LUN %(lun)s not exist in lungroup %(gp)s.',
                         {'lun': obj_id, 'gp': lungroup_id})
@@ -648,6 +1117,7 @@ class MappingView(CommonObject):
                      "hostLUNId": six.text_type(hostlun_id)}]
                 }
         result = self.put('/%(id)s', id=view_id, data=data)
+        self.client.host_lun_ids.remove(constants.LUN_TYPE, lun_id)
         _assert_result(result, 'Change hostlun id for lun %s in mappingview '
                                '%s error.', lun_id, view_id)
 
@@ -904,11 +1374,11 @@ class HyperMetroDomain(CommonObject):
     _obj_url = '/HyperMetroDomain'
 
     def get_hypermetro_domain_id(self, domain_name):
-        result = self.get('?range=[0-32]')
-        _assert_result(result, 'Get hyper metro domains info error.')
-        for item in result.get('data', []):
-            if domain_name == item['NAME']:
-                return item['ID']
+        domain = huawei_utils.find_in_pages(
+            _get_page_query(self, '?', 'Get hyper metro domains info error.'),
+            lambda item: item['NAME'] == domain_name)
+        if domain:
+            return domain['ID']
 
 
 class HyperMetroPair(CommonObject):
@@ -1069,6 +1539,9 @@ class ReplicationPair(CommonObject):
             _assert_result(result, 'Get replication pair %s error.', pair_id)
         return result['data']
 
+    def get_all_replication_pairs(self):
+        return _get_all_pages(self, '?', 'Get all replication pairs error.')
+
     def switch_replication_pair(self, pair_id):
         data = {"ID": pair_id}
         result = self.put('/switch', data=data)
@@ -1127,6 +1600,9 @@ class ReplicationConsistencyGroup(CommonObject):
                        group_id)
         return result['data']
 
+    def get_all_replication_groups(self):
+        return _get_all_pages(self, '?', 'Get all replication groups error.')
+
     def delete_replication_group(self, group_id):
         result = self.delete('/%(id)s', id=group_id)
         if _error_code(result) == constants.REPLICATION_GROUP_NOT_EXIST:
@@ -1144,6 +1620,7 @@ class ReplicationConsistencyGroup(CommonObject):
 class LicenseFeature(CommonObject):
     _obj_url = '/license/feature'
 
+    @cached_query('feature_status')
     def get_feature_status(self):
         result = self.get(log_filter=True)
         if result['error']['code'] != 0:
@@ -1223,18 +1700,37 @@ def rest_operation_wrapper(func):
 
 class RestClient(object):
     def __init__(self, address, user, password, vstore=None, ssl_verify=None,
-                 cert_path=None):
+                 cert_path=None,
+                 pool_connections=constants.DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize=constants.DEFAULT_POOL_MAXSIZE,
+                 pool_block=False):
         self.san_address = address
         self.san_user = user
         self.san_password = password
         self.vstore_name = vstore
         self.ssl_verify = ssl_verify
         self.cert_path = cert_path
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
 
         self._login_url = None
         self._login_device_id = None
+        # The array whose objects are in the caches.
+        self._cached_device_id = None
         self._session_lock = lockutils.ReaderWriterLock()
         self._session = None
+        # Never let more requests in flight than the pooled connections of
+        # one array, otherwise the extra connections are opened and dropped
+        # for each request.
+        self.limiter = AdaptiveLimiter(
+            max_limit=min(constants.CONCURRENCY_MAX_LIMIT, pool_maxsize))
+        self.cache = QueryCache()
+        self.host_lun_ids = HostLunIDCache()
+        self.status_poller = StatusPoller(self)
+        # Mapping objects of the hosts already attached, keyed by host and
+        # initiators, which let later attaches skip the create-or-get calls.
+        self.mapping_topology = {}
         self._init_object_methods()
 
     def _extract_obj_method(self, obj):
@@ -1295,7 +1791,7 @@ class RestClient(object):
             LOG.error(msg)
             raise exception.VolumeBackendAPIException(data=msg)
 
-    def _loop_login(self):
+    def _init_session(self):
         self._session = requests.Session()
         self._session.headers.update({
             "Connection": "keep-alive",
@@ -1304,9 +1800,20 @@ class RestClient(object):
         if self.ssl_verify:
             self._session.verify = self.cert_path
 
+        for url in self.san_address:
+            self._session.mount(url.lower(), HostNameIgnoringAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+                pool_block=self.pool_block))
+
+    def _loop_login(self):
+        # The session is kept across relogins, so the pooled keep-alive
+        # connections and their TLS sessions can be reused by new token.
+        if not self._session:
+            self._init_session()
+
         for url in self.san_address:
             try:
-                self._session.mount(url.lower(), HostNameIgnoringAdapter())
                 self._try_login(url)
             except Exception:
                 LOG.exception('Failed to login server %s.', url)
@@ -1316,6 +1823,7 @@ class RestClient(object):
                 self.san_address.remove(url)
                 self.san_address.append(url)
                 LOG.info('Login %s success.', url)
+                self._check_device_switch()
                 return
 
         self._session.close()
@@ -1325,10 +1833,69 @@ class RestClient(object):
         LOG.error(msg)
         raise exception.VolumeBackendAPIException(data=msg)
 
+    def _check_device_switch(self):
+        # A relogin to the same array keeps the cached objects valid, only
+        # those of another array are dropped.
+        if self._login_device_id != self._cached_device_id:
+            self.cache.invalidate()
+            self.host_lun_ids.invalidate()
+            self._cached_device_id = self._login_device_id
+
     def login(self):
         with self._session_lock.write_lock():
             self._loop_login()
 
+    def invalidate_cache(self, kind=None):
+        self.cache.invalidate(kind)
+
+    def update_credentials(self, address, user, password, vstore=None,
+                           **options):
+        """Update the login information and connection options.
+
+        options may carry ssl_verify, cert_path, pool_connections,
+        pool_maxsize and pool_block. The current session is kept if only
+        the credentials change, and they are used at next login. A changed
+        address or connection option needs new adapters, so a new session
+        is logged in at once. Requests in flight finish on the old session
+        and later ones wait for the swap. If the new session fails to
+        login, the old session and settings are kept.
+        """
+        attrs = dict(options, san_address=address, san_user=user,
+                     san_password=password, vstore_name=vstore)
+        with self._session_lock.write_lock():
+            rebuild = set(address) != set(self.san_address) or any(
+                getattr(self, key) != value
+                for key, value in options.items())
+            old_attrs = dict((key, getattr(self, key)) for key in attrs)
+            for key, value in attrs.items():
+                setattr(self, key, value)
+
+            if not rebuild or not self._session:
+                return
+
+            LOG.info('Connection options of %s are changed, rebuild the '
+                     'REST session.', self.san_address)
+            old_session = self._session
+            old_login_url = self._login_url
+            old_device_id = self._login_device_id
+            self._session = None
+            try:
+                self._loop_login()
+            except Exception:
+                with excutils.save_and_reraise_exception():
+                    LOG.error('Rebuild the REST session of %s failed, keep '
+                              'the old one.', self.san_address)
+                    for key, value in old_attrs.items():
+                        setattr(self, key, value)
+                    self._session = old_session
+                    self._login_url = old_login_url
+                    self._login_device_id = old_device_id
+
+            self.limiter.set_max_limit(
+                min(constants.CONCURRENCY_MAX_LIMIT, self.pool_maxsize))
+            self._logout_session(old_session, old_login_url)
+            old_session.close()
+
     def _relogin(self, old_token):
         with self._session_lock.write_lock():
             if (self._session and
@@ -1342,29 +1909,34 @@ class RestClient(object):
             self._loop_login()
 
     def _logout(self):
-        if not self._login_url:
+        try:
+            self._logout_session(self._session, self._login_url)
+        finally:
+            if self._session:
+                self._session.headers.pop('iBaseToken', None)
+            self._login_url = None
+            self._login_device_id = None
+
+    @staticmethod
+    def _logout_session(session, login_url):
+        if not login_url:
             return
 
         try:
-            r = self._session.delete(self._login_url + "/sessions")
+            r = session.delete(login_url + "/sessions")
             r.raise_for_status()
         except Exception:
             LOG.exception("Failed to logout session from URL %s.",
-                          self._login_url)
+                          login_url)
         else:
             result = r.json()
             if _error_code(result) == 0:
                 LOG.info("Succeed to logout session from URL %(url)s.",
-                         {"url": self._login_url})
+                         {"url": login_url})
             else:
                 LOG.warning("Failed to logout session from URL %(url)s "
                             "because of %(reason)s.",
-                            {"url": self._login_url, "reason": result})
-        finally:
-            self._session.close()
-            self._session = None
-            self._login_url = None
-            self._login_device_id = None
+                            {"url": login_url, "reason": result})
 
     @property
     def device_id(self):
@@ -1429,6 +2001,7 @@ class RestClient(object):
         result = self.put('/SWITCH_GROUP_ROLE', data=data)
         _assert_result(result, 'Switch replication group %s error.', group_id)
 
+    @cached_query('array_info')
     def get_array_info(self):
         result = self.get('/system/')
         _assert_result(result, 'Get array info error.')
@@ -1444,6 +2017,7 @@ class RestClient(object):
 
         return _error_code(result) == 0
 
+    @cached_query('controller_id')
     def get_controller_id(self, controller_name):
         result = self.get('/controller')
         _assert_result(result, 'Get controllers error.')
@@ -1462,6 +2036,7 @@ class RestClient(object):
         result = self.put('/lunclone_split_switch', data=data)
         _assert_result(result, 'split clone lun %s error.', clone_id)
 
+    @cached_query('workload_type_id')
     def get_workload_type_id(self, workload_type_name):
         url = "/workload_type?filter=NAME::%s" % workload_type_name
         result = self.get(url)
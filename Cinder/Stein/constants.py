@@ -28,9 +28,27 @@ FC_PORT_CONNECTED = '10'
 CAPACITY_UNIT = 1024 * 1024 * 2
 DEFAULT_WAIT_TIMEOUT = 3600 * 24 * 30
 DEFAULT_WAIT_INTERVAL = 5
+DEFAULT_WAIT_INITIAL_INTERVAL = 0.1
+STATUS_POLL_MIN_INTERVAL = 1
 MAX_NAME_LENGTH = 31
 SOCKET_TIMEOUT = 52
 LOGIN_SOCKET_TIMEOUT = 4
+
+CONCURRENCY_INITIAL_LIMIT = 20
+CONCURRENCY_MIN_LIMIT = 4
+CONCURRENCY_MAX_LIMIT = 128
+CONCURRENCY_BACKOFF_RATIO = 0.5
+CONCURRENCY_LATENCY_TOLERANCE = 2.0
+CONCURRENCY_LATENCY_FLOOR = 1
+CONCURRENCY_LATENCY_SMOOTHING = 0.1
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = CONCURRENCY_MAX_LIMIT
+QUERY_CACHE_TTL = 300
+QUERY_PAGE_SIZE = 100
+MAX_PARALLEL_WORKERS = 16
+ATTACH_BATCH_WINDOW = 0.05
+STATS_REFRESH_INTERVAL = 60
+CAPABILITY_CACHE_TTL = 3600 * 24
 PWD_EXPIRED_OR_INITIAL = (3, 4)
 
 LUN_STATUS = (LUN_ONLINE, LUN_INITIALIZING, LUN_OFFLINE) = ('27', '53', '28')
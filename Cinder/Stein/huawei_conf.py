@@ -35,45 +35,101 @@ from cinder.volume.drivers.huawei import constants
 LOG = logging.getLogger(__name__)
 
 
+def _node_snapshot(node):
+    """Convert a XML node to nested tuples, which can be compared."""
+    if node is None:
+        return None
+
+    return (node.tag,
+            tuple(sorted(node.attrib.items())),
+            (node.text or '').strip(),
+            tuple(_node_snapshot(child) for child in node))
+
+
 class HuaweiConf(object):
     def __init__(self, conf):
         self.conf = conf
         self.last_modify_time = None
+        self.last_snapshot = {}
+
+        # Handlers of each XML section, in the order they must run. A
+        # section is reparsed only when it is changed, or when a section
+        # it depends on is changed.
+        self.section_funcs = (
+            ('Storage', (), (
+                self._san_address,
+                self._san_user,
+                self._san_password,
+                self._san_vstore,
+                self._san_product,
+                self._ssl_cert_path,
+                self._ssl_cert_verify,
+                self._rest_pool_connections,
+                self._rest_pool_maxsize,
+                self._rest_pool_block,
+            )),
+            ('iSCSI', (), (
+                self._iscsi_info,
+            )),
+            ('FC', (), (
+                self._fc_info,
+            )),
+            ('LUN', ('Storage',), (
+                self._hyper_pair_sync_speed,
+                self._replication_pair_sync_speed,
+                self._replication_failover_concurrency,
+                self._hypermetro_devices,
+                self._replication_devices,
+                self._lun_type,
+                self._lun_write_type,
+                self._lun_prefetch,
+                self._storage_pools,
+                self._lun_copy_speed,
+                self._lun_copy_mode,
+            )),
+        )
 
     def update_config_value(self):
+        """Reload the config file if it is modified.
+
+        Returns the names of the XML sections changed since last load.
+        """
         file_time = os.stat(self.conf.cinder_huawei_conf_file).st_mtime
         if self.last_modify_time == file_time:
-            return
-
-        self.last_modify_time = file_time
-        tree = ET.parse(self.conf.cinder_huawei_conf_file)
-        xml_root = tree.getroot()
-        self._encode_authentication(tree, xml_root)
-
-        attr_funcs = (
-            self._san_address,
-            self._san_user,
-            self._san_password,
-            self._san_vstore,
-            self._san_product,
-            self._ssl_cert_path,
-            self._ssl_cert_verify,
-            self._iscsi_info,
-            self._fc_info,
-            self._hyper_pair_sync_speed,
-            self._replication_pair_sync_speed,
-            self._hypermetro_devices,
-            self._replication_devices,
-            self._lun_type,
-            self._lun_write_type,
-            self._lun_prefetch,
-            self._storage_pools,
-            self._lun_copy_speed,
-            self._lun_copy_mode,
-        )
-
-        for f in attr_funcs:
-            f(xml_root)
+            return set()
+
+        changed = set()
+        try:
+            tree = ET.parse(self.conf.cinder_huawei_conf_file)
+            xml_root = tree.getroot()
+            self._encode_authentication(tree, xml_root)
+
+            snapshot = dict(
+                (section, _node_snapshot(xml_root.find(section)))
+                for section, _depends, _funcs in self.section_funcs)
+
+            for section, depends, funcs in self.section_funcs:
+                if (section not in self.last_snapshot or
+                        snapshot[section] != self.last_snapshot[section] or
+                        changed.intersection(depends)):
+                    changed.add(section)
+                    for f in funcs:
+                        f(xml_root)
+        except Exception:
+            # Record the modify time of a bad config, so it is reported
+            # once instead of at every stats refresh. The snapshot is kept
+            # as the last good one, so the sections are applied again once
+            # the file is fixed.
+            self.last_modify_time = os.stat(
+                self.conf.cinder_huawei_conf_file).st_mtime
+            raise
+
+        self.last_modify_time = os.stat(
+            self.conf.cinder_huawei_conf_file).st_mtime
+        self.last_snapshot = snapshot
+        if changed:
+            LOG.info('Config sections %s are reloaded.', sorted(changed))
+        return changed
 
     def _encode_authentication(self, tree, xml_root):
         name_node = xml_root.find('Storage/UserName')
@@ -153,6 +209,48 @@ class HuaweiConf(object):
 
         setattr(self.conf, 'ssl_cert_verify', value)
 
+    def _get_positive_int(self, xml_root, path, default):
+        text = xml_root.findtext(path)
+        if not text:
+            return default
+
+        try:
+            value = int(text.strip())
+        except ValueError:
+            value = 0
+
+        if value <= 0:
+            msg = _("%(path)s configured error, it must be a positive "
+                    "integer, but %(text)s is specified."
+                    ) % {'path': path, 'text': text}
+            LOG.error(msg)
+            raise exception.InvalidInput(reason=msg)
+
+        return value
+
+    def _rest_pool_connections(self, xml_root):
+        value = self._get_positive_int(xml_root, 'Storage/RestPoolConnections',
+                                       constants.DEFAULT_POOL_CONNECTIONS)
+        setattr(self.conf, 'rest_pool_connections', value)
+
+    def _rest_pool_maxsize(self, xml_root):
+        value = self._get_positive_int(xml_root, 'Storage/RestPoolMaxSize',
+                                       constants.DEFAULT_POOL_MAXSIZE)
+        setattr(self.conf, 'rest_pool_maxsize', value)
+
+    def _rest_pool_block(self, xml_root):
+        value = False
+        text = xml_root.findtext('Storage/RestPoolBlock')
+        if text:
+            if text.lower() in ('true', 'false'):
+                value = text.lower() == 'true'
+            else:
+                msg = _("RestPoolBlock configured error.")
+                LOG.error(msg)
+                raise exception.InvalidInput(reason=msg)
+
+        setattr(self.conf, 'rest_pool_block', value)
+
     def _set_extra_constants_by_product(self, product):
         extra_constants = {}
         if product == 'Dorado':
@@ -268,6 +366,7 @@ class HuaweiConf(object):
 
         iscsi_info['initiators'] = initiators
         self._check_hostname_regex_config(iscsi_info)
+        self._index_hostname_config(iscsi_info)
         setattr(self.conf, 'iscsi_info', iscsi_info)
 
     def _fc_info(self, xml_root):
@@ -287,6 +386,7 @@ class HuaweiConf(object):
 
         fc_info['initiators'] = initiators
         self._check_hostname_regex_config(fc_info)
+        self._index_hostname_config(fc_info)
         setattr(self.conf, 'fc_info', fc_info)
 
     def _check_hostname_regex_config(self, info):
@@ -303,6 +403,27 @@ class HuaweiConf(object):
                     LOG.error(msg)
                     raise exception.InvalidInput(msg)
 
+    def _index_hostname_config(self, info):
+        """Precompile the HostName patterns for find_config_info.
+
+        hostname_patterns keeps the patterns in the order they are matched,
+        default_hostname_info is the config of HostName '*', and
+        hostname_cache remembers the config matched by each host.
+        """
+        patterns = []
+        default_info = None
+        for ini in info['initiators'].values():
+            if not ini.get('HostName'):
+                continue
+            if ini['HostName'] == '*':
+                default_info = ini
+            else:
+                patterns.append((re.compile(ini['HostName']), ini))
+
+        info['hostname_patterns'] = patterns
+        info['default_hostname_info'] = default_info
+        info['hostname_cache'] = {}
+
     def _parse_remote_initiator_info(self, dev, ini_type):
         ini_info = {'default_target_ips': []}
 
@@ -354,6 +475,7 @@ class HuaweiConf(object):
 
         ini_info['initiators'] = initiators
         self._check_hostname_regex_config(ini_info)
+        self._index_hostname_config(ini_info)
         return ini_info
 
     def _hypermetro_devices(self, xml_root):
@@ -395,6 +517,8 @@ class HuaweiConf(object):
                 'fc_info': self._parse_remote_initiator_info(
                     dev, 'fc_info'),
                 'sync_speed': self.conf.replica_sync_speed,
+                'failover_concurrency':
+                    self.conf.replica_failover_concurrency,
             }
 
         setattr(self.conf, 'replication', config)
@@ -462,3 +586,9 @@ class HuaweiConf(object):
         else:
             speed = text.strip()
         setattr(self.conf, 'replica_sync_speed', int(speed))
+
+    def _replication_failover_concurrency(self, xml_root):
+        value = self._get_positive_int(
+            xml_root, 'LUN/ReplicaFailoverConcurrency',
+            constants.MAX_PARALLEL_WORKERS)
+        setattr(self.conf, 'replica_failover_concurrency', value)
@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+
 from oslo_log import log as logging
 
 from cinder import coordination
@@ -44,8 +46,38 @@ class HuaweiISCSIDriver(huawei_base_driver.HuaweiBaseDriver,
 
         return self._stats
 
-    @coordination.synchronized('huawei-mapping-{connector[host]}')
     def initialize_connection(self, volume, connector):
+        metadata = huawei_utils.get_volume_private_data(volume)
+        if metadata.get('hypermetro'):
+            return self._initialize_connection(volume, connector)
+
+        # Concurrent attaches to the same host are mapped by one flow.
+        return self.attach_coalescer.submit(
+            self._get_connector_key(connector), volume,
+            functools.partial(self._initialize_connections,
+                              connector=connector),
+            functools.partial(self._initialize_connection,
+                              connector=connector))
+
+    @coordination.synchronized('huawei-mapping-{connector[host]}')
+    def _initialize_connections(self, volumes, connector):
+        LOG.info('Initialize iscsi connection for volumes %(ids)s, '
+                 'connector info %(conn)s.',
+                 {'ids': [volume.id for volume in volumes],
+                  'conn': connector})
+        mapping_infos = huawei_flow.initialize_iscsi_connections(
+            volumes, connector, self.local_cli, self.configuration)
+
+        conns = []
+        for mapping_info in mapping_infos:
+            mapping_info.pop('aval_host_lun_ids', None)
+            conns.append({'driver_volume_type': 'iscsi',
+                          'data': mapping_info})
+        LOG.info('Initialize iscsi connection successfully: %s.', conns)
+        return conns
+
+    @coordination.synchronized('huawei-mapping-{connector[host]}')
+    def _initialize_connection(self, volume, connector):
         LOG.info('Initialize iscsi connection for volume %(id)s, '
                  'connector info %(conn)s.',
                  {'id': volume.id, 'conn': connector})
@@ -142,8 +174,41 @@ class HuaweiFCDriver(huawei_base_driver.HuaweiBaseDriver,
 
         return self._stats
 
-    @coordination.synchronized('huawei-mapping-{connector[host]}')
     def initialize_connection(self, volume, connector):
+        metadata = huawei_utils.get_volume_private_data(volume)
+        if metadata.get('hypermetro'):
+            return self._initialize_connection(volume, connector)
+
+        # Concurrent attaches to the same host are mapped by one flow.
+        return self.attach_coalescer.submit(
+            self._get_connector_key(connector), volume,
+            functools.partial(self._initialize_connections,
+                              connector=connector),
+            functools.partial(self._initialize_connection,
+                              connector=connector))
+
+    @coordination.synchronized('huawei-mapping-{connector[host]}')
+    def _initialize_connections(self, volumes, connector):
+        LOG.info('Initialize FC connection for volumes %(ids)s, '
+                 'connector info %(conn)s.',
+                 {'ids': [volume.id for volume in volumes],
+                  'conn': connector})
+        mapping_infos = huawei_flow.initialize_fc_connections(
+            volumes, connector, self.fc_san, self.local_cli,
+            self.configuration)
+
+        conns = []
+        for mapping_info in mapping_infos:
+            mapping_info.pop('aval_host_lun_ids', None)
+            conn = {'driver_volume_type': 'fibre_channel',
+                    'data': mapping_info}
+            zm_utils.add_fc_zone(conn)
+            conns.append(conn)
+        LOG.info('Initialize FC connection successfully: %s.', conns)
+        return conns
+
+    @coordination.synchronized('huawei-mapping-{connector[host]}')
+    def _initialize_connection(self, volume, connector):
         LOG.info('Initialize FC connection for volume %(id)s, '
                  'connector info %(conn)s.',
                  {'id': volume.id, 'conn': connector})
@@ -15,6 +15,7 @@
 #
 
 import six
+import threading
 
 from oslo_log import log as logging
 import taskflow.engines
@@ -31,13 +32,14 @@ LOG = logging.getLogger(__name__)
 
 
 class BaseReplicationOp(object):
+    _obj_type = None
+
     def __init__(self, loc_client, rmt_client):
         self.loc_client = loc_client
         self.rmt_client = rmt_client
 
     def _wait_until_status(self, rep_id, expect_statuses):
-        def _status_check():
-            info = self.get_info(rep_id)
+        def _status_check(info):
             if info['HEALTHSTATUS'] != constants.REPLICA_HEALTH_STATUS_NORMAL:
                 msg = _('Replication status %s is abnormal.'
                         ) % info['HEALTHSTATUS']
@@ -49,13 +51,12 @@ class BaseReplicationOp(object):
 
             return False
 
-        huawei_utils.wait_for_condition(_status_check,
-                                        constants.DEFAULT_WAIT_INTERVAL,
-                                        constants.DEFAULT_WAIT_TIMEOUT)
+        self.rmt_client.status_poller.wait(self._obj_type, rep_id,
+                                           _status_check,
+                                           constants.DEFAULT_WAIT_TIMEOUT)
 
     def _wait_until_role(self, rep_id, is_primary):
-        def _role_check():
-            info = self.get_info(rep_id)
+        def _role_check(info):
             if info['HEALTHSTATUS'] != constants.REPLICA_HEALTH_STATUS_NORMAL:
                 msg = _('Replication status %s is abnormal.'
                         ) % info['HEALTHSTATUS']
@@ -67,9 +68,9 @@ class BaseReplicationOp(object):
 
             return False
 
-        huawei_utils.wait_for_condition(_role_check,
-                                        constants.DEFAULT_WAIT_INTERVAL,
-                                        constants.DEFAULT_WAIT_TIMEOUT)
+        self.rmt_client.status_poller.wait(self._obj_type, rep_id,
+                                           _role_check,
+                                           constants.DEFAULT_WAIT_TIMEOUT)
 
     def create(self, params):
         return self._create(params)
@@ -102,7 +103,7 @@ class BaseReplicationOp(object):
     def protect_secondary(self, rep_id):
         self._protect_secondary(rep_id)
 
-    def failover(self, rep_id):
+    def failover(self, rep_id, rep_info=None):
         """Failover replication.
 
         Steps:
@@ -110,7 +111,7 @@ class BaseReplicationOp(object):
             2. Set secondary access readable & writable.
             3. Try to switch replication roles.
         """
-        self.split(rep_id)
+        self.split(rep_id, rep_info)
         self.unprotect_secondary(rep_id)
         try:
             self.switch(rep_id)
@@ -121,7 +122,7 @@ class BaseReplicationOp(object):
             LOG.warning('Switch replication %s roles failed, but secondary '
                         'is readable&writable now.', rep_id)
 
-    def failback(self, rep_id):
+    def failback(self, rep_id, rep_info=None):
         """Failback replication.
 
         Steps:
@@ -129,7 +130,7 @@ class BaseReplicationOp(object):
         2. Sync original secondary data back to original primary.
         3. Recover original primary&secondary replication relationship.
         """
-        info = self.get_info(rep_id)
+        info = rep_info or self.get_info(rep_id)
         self.split(rep_id, info)
         self.unprotect_secondary(rep_id)
 
@@ -148,6 +149,8 @@ class BaseReplicationOp(object):
 
 
 class ReplicationPairOp(BaseReplicationOp):
+    _obj_type = 'replication_pair'
+
     def get_info(self, rep_id):
         return self.rmt_client.get_replication_pair_by_id(rep_id)
 
@@ -176,6 +179,8 @@ class ReplicationPairOp(BaseReplicationOp):
 
 
 class ReplicationGroupOp(BaseReplicationOp):
+    _obj_type = 'replication_group'
+
     def get_info(self, rep_id):
         return self.rmt_client.get_replication_group_by_id(rep_id)
 
@@ -289,6 +294,8 @@ class ReplicationManager(object):
         self.pair_op = ReplicationPairOp(self.loc_client, self.rmt_client)
         self.group_op = ReplicationGroupOp(self.loc_client, self.rmt_client)
         self.configs = configs
+        self._concurrency = configs.get('failover_concurrency',
+                                        constants.MAX_PARALLEL_WORKERS)
 
     def create_replica(self, local_lun_id, lun_params, replica_model):
         """Create remote LUN and replication pair.
@@ -356,21 +363,51 @@ class ReplicationManager(object):
             else:
                 self.pair_op.sync(pair_id)
 
+    def _prefetch_infos(self, op, list_func, rep_ids):
+        """Get infos of replication pairs or groups indexed by ID.
+
+        Many objects are fetched by paged list queries of all of them, and
+        the ones not listed are queried one by one.
+        """
+        infos = {}
+        if len(rep_ids) > 1:
+            try:
+                for info in list_func():
+                    infos[info['ID']] = info
+            except Exception:
+                LOG.exception('List %s failed, query them one by one.',
+                              op._obj_type)
+
+        missing_ids = list(set(rep_ids) - set(infos))
+        futures = huawei_utils.execute_in_parallel(
+            op.get_info, missing_ids, self._concurrency)
+        for rep_id, future in zip(missing_ids, futures):
+            infos[rep_id] = future.result()
+
+        return dict((rep_id, infos[rep_id]) for rep_id in rep_ids)
+
     def _pre_fail_check(self, volumes, statuc_check_func):
         normal_volumes = []
         pair_ids = []
         group_ids = set()
         volume_pair_infos = {}
 
+        volume_pairs = []
         for v in volumes:
             drv_data = huawei_utils.to_dict(v.replication_driver_data)
             pair_id = drv_data.get('pair_id')
             if not pair_id:
                 normal_volumes.append(v.id)
                 continue
+            volume_pairs.append((v.id, pair_id))
 
-            pair_info = self.pair_op.get_info(pair_id)
-            volume_pair_infos[v.id] = pair_info
+        all_pair_infos = self._prefetch_infos(
+            self.pair_op, self.rmt_client.get_all_replication_pairs,
+            [pair_id for _v, pair_id in volume_pairs])
+
+        for volume_id, pair_id in volume_pairs:
+            pair_info = all_pair_infos[pair_id]
+            volume_pair_infos[volume_id] = pair_info
 
             cg_id = pair_info.get('CGID')
             if cg_id:
@@ -390,27 +427,72 @@ class ReplicationManager(object):
                 LOG.error(msg)
                 raise exception.InvalidReplicationTarget(reason=msg)
 
-        return normal_volumes, list(group_ids), pair_ids, volume_pair_infos
+        group_infos = self._prefetch_infos(
+            self.group_op, self.rmt_client.get_all_replication_groups,
+            list(group_ids))
+        pair_infos = dict((pair_id, all_pair_infos[pair_id])
+                          for pair_id in pair_ids)
+        return normal_volumes, group_infos, pair_infos, volume_pair_infos
+
+    def _run_fail_ops(self, fail_ops):
+        """Run failover/failback of groups and pairs concurrently.
+
+        All the operations are finished before the first error is raised.
+        """
+        lock = threading.Lock()
+        progress = {'finished': 0, 'failed': 0}
+
+        def _run(fail_op):
+            func, rep_id, rep_info = fail_op
+            succeeded = False
+            try:
+                func(rep_id, rep_info)
+                succeeded = True
+            finally:
+                with lock:
+                    progress['finished'] += 1
+                    if not succeeded:
+                        progress['failed'] += 1
+                    LOG.info('Replication %(id)s failover/failback '
+                             '%(result)s, progress: %(finished)s/%(total)s, '
+                             'failed: %(failed)s.',
+                             {'id': rep_id,
+                              'result': 'done' if succeeded else 'failed',
+                              'finished': progress['finished'],
+                              'total': len(fail_ops),
+                              'failed': progress['failed']})
+
+        futures = huawei_utils.execute_in_parallel(_run, fail_ops,
+                                                   self._concurrency)
+        for future in futures:
+            if future.exception():
+                raise future.exception()
 
     def _fail_op(self, volumes, status_check_func, fail_group_func,
                  fail_pair_func):
-        (normal_volumes, group_ids, pair_ids, volume_pair_infos
+        (normal_volumes, group_infos, pair_infos, volume_pair_infos
          ) = self._pre_fail_check(volumes, status_check_func)
 
-        for group in group_ids:
-            fail_group_func(group)
-
-        for pair in pair_ids:
-            fail_pair_func(pair)
+        fail_ops = ([(fail_group_func, group_id, group_info)
+                     for group_id, group_info in group_infos.items()] +
+                    [(fail_pair_func, pair_id, pair_info)
+                     for pair_id, pair_info in pair_infos.items()])
+        self._run_fail_ops(fail_ops)
 
-        volumes_update = []
         for v in volumes:
             if v.id in normal_volumes:
                 LOG.warning("Volume %s doesn't have replication.", v.id)
-                continue
 
+        rep_volumes = [v for v in volumes if v.id in volume_pair_infos]
+        futures = huawei_utils.execute_in_parallel(
+            lambda v: self.rmt_client.get_lun_info_by_id(
+                volume_pair_infos[v.id]['LOCALRESID']),
+            rep_volumes, self._concurrency)
+
+        volumes_update = []
+        for v, future in zip(rep_volumes, futures):
             rmt_lun_id = volume_pair_infos[v.id]['LOCALRESID']
-            rmt_lun_info = self.rmt_client.get_lun_info_by_id(rmt_lun_id)
+            rmt_lun_info = future.result()
             location = huawei_utils.to_string(
                 huawei_lun_id=rmt_lun_id,
                 huawei_lun_wwn=rmt_lun_info['WWN'],
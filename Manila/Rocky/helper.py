@@ -17,15 +17,16 @@ import base64
 import json
 import requests
 import six
+import threading
 import time
 
+from oslo_concurrency import lockutils
 from oslo_log import log
 
 from manila import exception
 from manila.i18n import _
 from manila.share.drivers.huawei import constants
 from manila.share.drivers.huawei import huawei_utils
-from manila import utils
 
 LOG = log.getLogger(__name__)
 
@@ -51,6 +52,9 @@ class RestHelper(object):
         self.nas_password = nas_password
         self.url = None
         self.session = None
+        self._session_lock = lockutils.ReaderWriterLock()
+        self._semaphore = threading.Semaphore(
+            constants.MAX_CONCURRENT_REQUESTS)
 
         LOG.warning("Suppressing requests library SSL Warnings")
         requests.packages.urllib3.disable_warnings(
@@ -119,6 +123,10 @@ class RestHelper(object):
         return username, password
 
     def login(self):
+        with self._session_lock.write_lock():
+            self._login()
+
+    def _login(self):
         username, password = self._get_user_info()
         for item_url in self.nas_address:
             data = {"username": username,
@@ -158,14 +166,29 @@ class RestHelper(object):
             result = self.do_call(url, "DELETE")
             _assert_result(result, 'Logout session error.')
 
-    @utils.synchronized('huawei_manila')
+    def _relogin(self, old_token):
+        with self._session_lock.write_lock():
+            if (self.session and
+                    self.session.headers.get('iBaseToken') != old_token):
+                LOG.info('Relogin has been done by other thread, '
+                         'no need relogin again.')
+                return
+            self._login()
+
     def call(self, url, method, data=None, **kwargs):
-        result = self.do_call(url, method, data, **kwargs)
-        if _error_code(result) in (constants.ERROR_CONNECT_TO_SERVER,
-                                   constants.ERROR_UNAUTHORIZED_TO_SERVER):
-            LOG.error("Can't open the recent url, relogin.")
-            self.login()
-            result = self.do_call(url, method, data, **kwargs)
+        with self._semaphore:
+            with self._session_lock.read_lock():
+                old_token = (self.session.headers.get('iBaseToken')
+                             if self.session else None)
+                result = self.do_call(url, method, data, **kwargs)
+
+            if _error_code(result) in (constants.ERROR_CONNECT_TO_SERVER,
+                                       constants.ERROR_UNAUTHORIZED_TO_SERVER):
+                LOG.error("Can't open the recent url, relogin.")
+                self._relogin(old_token)
+                with self._session_lock.read_lock():
+                    result = self.do_call(url, method, data, **kwargs)
+
         return result
 
     def create_filesystem(self, fs_param):
@@ -274,22 +297,6 @@ class RestHelper(object):
             if access['NAME'] == access_to:
                 return access
 
-    def _get_share_access_count(self, share_id, share_proto, vstore_id=None):
-        if share_proto == 'NFS':
-            url = "/NFS_SHARE_AUTH_CLIENT"
-        elif share_proto == 'CIFS':
-            url = "/CIFS_SHARE_AUTH_CLIENT"
-        else:
-            msg = _('Invalid NAS protocol %s.') % share_proto
-            raise exception.InvalidInput(reason=msg)
-
-        url += "/count?filter=PARENTID::%s" % share_id
-        data = {'vstoreId': vstore_id} if vstore_id else None
-        result = self.call(url, "GET", data)
-
-        _assert_result(result, 'Get access count of share %s error.', share_id)
-        return int(result['data']['COUNT'])
-
     def _get_share_access_by_range(self, share_id, share_proto,
                                    range, vstore_id=None):
         if share_proto == 'NFS':
@@ -308,18 +315,11 @@ class RestHelper(object):
         return result.get('data', [])
 
     def get_all_share_access(self, share_id, share_proto, vstore_id=None):
-        count = self._get_share_access_count(share_id, share_proto, vstore_id)
-        if count <= 0:
-            return []
-
-        all_accesses = []
-        for i in range(count // 100 + 1):
-            query_range = i * 100, (i + 1) * 100
-            accesses = self._get_share_access_by_range(
-                share_id, share_proto, query_range, vstore_id)
-            all_accesses.extend(accesses)
+        def _query_page(start, end):
+            return self._get_share_access_by_range(
+                share_id, share_proto, (start, end), vstore_id)
 
-        return all_accesses
+        return list(huawei_utils.iter_pages(_query_page, prefetch=True))
 
     def change_access(self, access_id, share_proto, access_level,
                       vstore_id=None):
@@ -416,33 +416,51 @@ class RestHelper(object):
         _assert_result(result, 'Create snapshot %s error.', data)
         return result['data']['ID']
 
+    def _iter_shares(self, url, share_name, vstore_id, check_result=True,
+                     missing=None):
+        data = {'vstoreId': vstore_id} if vstore_id else None
+
+        def _query_page(start, end):
+            result = self.call(url + "&range=[%s-%s]" % (start, end), "GET",
+                               data)
+            if _error_code(result) == constants.SHARE_PATH_INVALID:
+                LOG.warning('Share %s not exist.', share_name)
+                if missing is not None:
+                    missing.append(share_name)
+                return []
+            if check_result:
+                _assert_result(result, 'Get share by name %s error.',
+                               share_name)
+            return result.get('data') or []
+
+        return huawei_utils.iter_pages(_query_page)
+
     def get_share_by_name(self, share_name, share_proto, vstore_id=None):
         if share_proto == 'NFS':
             share_path = huawei_utils.share_path(share_name)
-            url = "/NFSHARE?filter=SHAREPATH::%s&range=[0-100]" % share_path
+            shares = self._iter_shares(
+                "/NFSHARE?filter=SHAREPATH::%s" % share_path, share_name,
+                vstore_id)
+            return next(shares, None)
         elif share_proto == 'CIFS':
             cifs_share = huawei_utils.share_name(share_name)
-            url = "/CIFSHARE?filter=NAME:%s&range=[0-100]" % cifs_share
+            missing = []
+            shares = self._iter_shares(
+                "/CIFSHARE?filter=NAME:%s" % cifs_share, share_name,
+                vstore_id, missing=missing)
+            share = next(shares, None)
+            if share or missing:
+                return share
+
+            # for CIFS, if didn't get share by NAME, try DESCRIPTION
+            shares = self._iter_shares(
+                "/CIFSHARE?filter=DESCRIPTION:%s" % share_name, share_name,
+                vstore_id, check_result=False)
+            return next(shares, None)
         else:
             msg = _('Invalid NAS protocol %s.') % share_proto
             raise exception.InvalidInput(reason=msg)
 
-        data = {'vstoreId': vstore_id} if vstore_id else None
-        result = self.call(url, "GET", data)
-        if _error_code(result) == constants.SHARE_PATH_INVALID:
-            LOG.warning('Share %s not exist.', share_name)
-            return
-
-        _assert_result(result, 'Get share by name %s error.', share_name)
-
-        # for CIFS, if didn't get share by NAME, try DESCRIPTION
-        if share_proto == 'CIFS' and not result.get('data'):
-            url = "/CIFSHARE?filter=DESCRIPTION:%s&range=[0-100]" % share_name
-            result = self.call(url, "GET", data)
-
-        if result.get('data'):
-            return result['data'][0]
-
     def get_fs_info_by_name(self, name):
         url = "/filesystem?filter=NAME::%s" % huawei_utils.share_name(name)
         result = self.call(url, "GET")
@@ -859,23 +877,33 @@ class RestHelper(object):
             return
         _assert_result(result, 'Delete HyperMetro pair %s error.', pair_id)
 
+    def _get_page_query(self, url, msg, **kwargs):
+        def _query(start, end):
+            result = self.call("%s?range=[%s-%s]" % (url, start, end), "GET",
+                               **kwargs)
+            _assert_result(result, msg)
+            return result.get("data", [])
+        return _query
+
     def get_hypermetro_domain_id(self, domain_name):
-        result = self.call("/HyperMetroDomain?range=[0-100]", "GET")
-        _assert_result(result, "Get HyperMetro domains info error.")
-        for item in result.get("data", []):
-            if item.get("NAME") == domain_name:
-                return item.get("ID")
+        domain = huawei_utils.find_in_pages(
+            self._get_page_query("/HyperMetroDomain",
+                                 "Get HyperMetro domains info error."),
+            lambda item: item.get("NAME") == domain_name)
+        if domain:
+            return domain.get("ID")
 
     def get_hypermetro_vstore_id(self, domain_name, local_vstore_name,
                                  remote_vstore_name):
-        result = self.call("/vstore_pair?range=[0-100]", "GET",
-                           data=None, log_filter=True)
-        _assert_result(result, "Get HyperMetro vstore_pair id error.")
-        for item in result.get("data", []):
-            if item.get("DOMAINNAME") == domain_name and item.get(
-                    "LOCALVSTORENAME") == local_vstore_name and item.get(
-                    "REMOTEVSTORENAME") == remote_vstore_name:
-                return item.get("ID")
+        vstore_pair = huawei_utils.find_in_pages(
+            self._get_page_query("/vstore_pair",
+                                 "Get HyperMetro vstore_pair id error.",
+                                 data=None, log_filter=True),
+            lambda item: (item.get("DOMAINNAME") == domain_name and
+                          item.get("LOCALVSTORENAME") == local_vstore_name and
+                          item.get("REMOTEVSTORENAME") == remote_vstore_name))
+        if vstore_pair:
+            return vstore_pair.get("ID")
         return None
 
     def get_hypermetro_vstore_by_pair_id(self, vstore_pair_id):
@@ -33,6 +33,8 @@ PWD_EXPIRED_OR_INITIAL = (3, 4)
 
 SOCKET_TIMEOUT = 52
 LOGIN_SOCKET_TIMEOUT = 4
+MAX_CONCURRENT_REQUESTS = 20
+QUERY_PAGE_SIZE = 100
 QOS_NAME_PREFIX = 'OpenStack_'
 TMP_PATH_SRC_PREFIX = "huawei_manila_tmp_path_src_"
 TMP_PATH_DST_PREFIX = "huawei_manila_tmp_path_dst_"